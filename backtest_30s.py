@@ -1,367 +1,618 @@
 import pandas as pd
 import glob
+import sys
 import os
 import gc
 import numpy as np
 import time
+import io
+import hashlib
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from datetime import timedelta
+
+from numba_compat import njit, NUMBA_AVAILABLE
+
+try:
+    import pyarrow  # noqa: F401 - Parquet engine for the per-file trade cache
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
 
 # --- Configuration ---
 TARGETS = [4, 7.5, 10, 15, 20] # Targets to analyze for "MAE on Winners"
 FILE_PATTERN = "*_ticks.h5"
 
-def get_trade_stats(day_data):
-    if len(day_data) < 2:
-        return None
-
-    # session_start is 09:30:00 (Local New York Time)
-    current_date = day_data.index[0].date()
-    session_start = pd.Timestamp(year=current_date.year, month=current_date.month, day=current_date.day,
-                                 hour=9, minute=30, second=0).tz_localize('US/Eastern')
-    or_end_time = session_start + timedelta(seconds=30)
-    session_end = session_start.replace(hour=16, minute=0, second=0, microsecond=0)
-    time_stop_limit = session_start.replace(hour=11, minute=30, second=0)
-
-    # 1. Slice Opening Range (Exactly 9:30:00 to 9:30:30)
-    or_slice = day_data[(day_data.index >= session_start) & (day_data.index <= or_end_time)]
-
-    # RTH slice for Daily High/Low (9:30:00 to 16:00:00)
-    rth_slice = day_data[(day_data.index >= session_start) & (day_data.index <= session_end)]
+# HDF5 raw-data chunk cache for tick reads. The 1 MB default evicts chunks
+# mid-read on multi-GB files; this keeps the working set resident so each
+# chunk is decompressed once. nslots is a prime well above the chunk count.
+H5_CACHE_BYTES = 256 * 1024 * 1024
+H5_CACHE_SLOTS = 100003
+
+# Per-file trade results are cached here as Parquet, keyed on the tick file's
+# path and mtime plus a hash of this script, so editing the strategies
+# invalidates every entry.
+CACHE_DIR = "cache"
+CONFIG_HASH = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+def _first_true(mask):
+    """Index of the first True in a boolean array, or len(mask) if there is none."""
+    if len(mask) == 0:
+        return 0
+    i = mask.argmax()
+    return i if mask[i] else len(mask)
+
+@njit(cache=True)
+def _run_strategies_jit(prices, times_ns, entry_idx, entry_price, direction_sign, or_width, fade_start_ns, time_stop_ns):
+    """
+    Evaluate S1-S5 for one trade in a single pass over the post-OR prices.
+
+    Returns (pnl, triggered) arrays indexed S1..S5.
+    """
+    n = len(prices)
+    pnl = np.zeros(5)
+    triggered = np.zeros(5, dtype=np.bool_)
+    narrow = or_width < 5.0
+    final_p = prices[n - 1]
+
+    # S1 / S5 only trade narrow ranges, S2 only narrow-range shorts
+    s1_open = narrow
+    s4_open = True
+    s2_state = 0 if (narrow and direction_sign < 0) else 2  # 0 = waiting, 1 = in trade, 2 = done
+    s2_entry_price = entry_price - 2.0
+
+    # S3 state
+    s3_state = 0  # 0 = scanning for reversal, 1 = in fade trade, 2 = done
+    extreme_price = prices[entry_idx]
+    extension_reached = False
+    trigger_dist = max(5.0, or_width)  # Minimum 5pt trigger to avoid noise on tiny ranges
+    min_stretch = or_width * 3.0
+    fade_entry_p = 0.0
+    fade_stop_p = 0.0
+
+    triggered[0] = narrow
+    triggered[3] = True
+    triggered[4] = narrow
+
+    run_start = entry_idx  # First tick sharing the current timestamp
+    for i in range(entry_idx, n):
+        p = prices[i]
+        if times_ns[i] != times_ns[run_start]:
+            run_start = i
+        move = direction_sign * (p - entry_price)
+
+        # --- S1: Volatility Filter (15/15) ---
+        if s1_open:
+            if move >= 15.0:
+                pnl[0] = 15.0
+                s1_open = False
+            elif move <= -15.0:
+                pnl[0] = -15.0
+                s1_open = False
+
+        # --- S4: Time-Based Exit (30/25, 11:30 AM ET time stop) ---
+        if s4_open:
+            if move >= 30.0:
+                pnl[3] = 30.0
+                s4_open = False
+            elif move <= -25.0:
+                pnl[3] = -25.0
+                s4_open = False
+            elif times_ns[i] >= time_stop_ns and move < 5.0:
+                pnl[3] = move
+                s4_open = False
+
+        # --- S2: Short Bias Momentum (entry at OR Low - 2.0, 30/15) ---
+        if s2_state == 0 and p <= s2_entry_price:
+            s2_state = 1
+            triggered[1] = True
+            # Ticks sharing the entry timestamp belong to the S2 path as well
+            for j in range(run_start, i):
+                if prices[j] <= s2_entry_price - 30.0:
+                    pnl[1] = 30.0
+                    s2_state = 2
+                    break
+                if prices[j] >= s2_entry_price + 15.0:
+                    pnl[1] = -15.0
+                    s2_state = 2
+                    break
+        if s2_state == 1:
+            if p <= s2_entry_price - 30.0:
+                pnl[1] = 30.0
+                s2_state = 2
+            elif p >= s2_entry_price + 15.0:
+                pnl[1] = -15.0
+                s2_state = 2
+
+        # --- S3: Stretched Fade (3x OR stretch, 1x OR reversal after 10:00 AM ET) ---
+        if s3_state == 0:
+            if direction_sign > 0:
+                extreme_price = max(extreme_price, p)
+            else:
+                extreme_price = min(extreme_price, p)
+            if move >= min_stretch:
+                extension_reached = True
+            if extension_reached and times_ns[i] >= fade_start_ns and direction_sign * (extreme_price - p) >= trigger_dist:
+                s3_state = 1
+                triggered[2] = True
+                fade_entry_p = p
+                fade_stop_p = extreme_price + 2.0 * direction_sign  # Peak + 2pt / Trough - 2pt
+                for j in range(run_start, i):
+                    if -direction_sign * (prices[j] - fade_entry_p) >= 15.0:
+                        pnl[2] = 15.0
+                        s3_state = 2
+                        break
+                    if direction_sign * (prices[j] - fade_stop_p) >= 0.0:
+                        pnl[2] = direction_sign * (fade_entry_p - fade_stop_p)
+                        s3_state = 2
+                        break
+        if s3_state == 1:
+            if -direction_sign * (p - fade_entry_p) >= 15.0:
+                pnl[2] = 15.0
+                s3_state = 2
+            elif direction_sign * (p - fade_stop_p) >= 0.0:
+                pnl[2] = direction_sign * (fade_entry_p - fade_stop_p)
+                s3_state = 2
+
+        if not s1_open and not s4_open and s2_state == 2 and s3_state == 2:
+            break
+
+    # Trades still open at the session close are marked to the last price
+    if s1_open:
+        pnl[0] = direction_sign * (final_p - entry_price)
+    if s4_open:
+        pnl[3] = direction_sign * (final_p - entry_price)
+    if s2_state == 1:
+        pnl[1] = s2_entry_price - final_p
+    if s3_state == 1:
+        pnl[2] = direction_sign * (fade_entry_p - final_p)
+
+    # --- S5: Master Alpha (S1 + S4) ---
+    # Same exits as S4, restricted to the S1 volatility filter
+    if narrow:
+        pnl[4] = pnl[3]
+
+    return pnl, triggered
+
+def _run_strategies_numpy(prices, times_ns, entry_idx, entry_price, direction_sign, or_width, fade_start_ns, time_stop_ns):
+    """NumPy equivalent of _run_strategies_jit, used when Numba is not installed."""
+    pnl = np.zeros(5)
+    triggered = np.zeros(5, dtype=np.bool_)
+    narrow = or_width < 5.0
+    path = prices[entry_idx:]
+    path_times = times_ns[entry_idx:]
+    # Favourable move in points: positive is profit for the breakout direction
+    move = direction_sign * (path - entry_price)
+    final_move = move[-1] # Mark-to-market for trades still open at the close
+
+    # --- S1: Volatility Filter (< 5pt OR, 15/15) ---
+    if narrow:
+        triggered[0] = True
+        i_t = _first_true(move >= 15.0)
+        i_s = _first_true(move <= -15.0)
+        pnl[0] = 15.0 if i_t < i_s else (-15.0 if i_s < i_t else final_move)
+
+    # --- S2: Short Bias Momentum (Filtered & Confirmed) ---
+    # 1. Only trade if or_width < 5.0
+    # 2. Entry at or_low - 2.0 (Momentum Confirmation)
+    # 3. Target: 30.0 pts | Stop: 15.0 pts
+    if direction_sign < 0 and narrow:
+        # Find the specific entry time for the 2.0pt buffer
+        s2_entry_price = entry_price - 2.0
+        s2_entry_mask = path <= s2_entry_price
+
+        if s2_entry_mask.any():
+            triggered[1] = True
+            # Ticks sharing the entry timestamp belong to the S2 path as well
+            s2_start = np.searchsorted(path_times, path_times[s2_entry_mask.argmax()])
+            s2_path = path[s2_start:]
+
+            i_t = _first_true(s2_path <= s2_entry_price - 30.0)
+            i_s = _first_true(s2_path >= s2_entry_price + 15.0)
+
+            pnl[1] = 30.0 if i_t < i_s else (-15.0 if i_s < i_t else (s2_entry_price - path[-1]))
+
+    # --- S3: Stretched Fade ---
+    # 1. Must move 3.0x OR Width from Entry
+    # 2. Must happen after 10:00 AM ET
+    # 3. Trigger is 1.0x OR Width reversal from peak/trough
+    # Work in direction-signed prices so the peak (Long) or trough (Short) is a
+    # running max; negation is exact, so the comparisons match the scalar loop.
+    trigger_dist = max(5.0, or_width) # Minimum 5pt trigger to avoid noise on tiny ranges
+    min_stretch = or_width * 3.0
+
+    signed = path * direction_sign
+    extreme = np.maximum.accumulate(signed)
+    i_ext = _first_true(move >= min_stretch)
+    i_from = max(i_ext, np.searchsorted(path_times, fade_start_ns))
+    fade_entry_idx = i_from + _first_true(signed[i_from:] <= extreme[i_from:] - trigger_dist)
+
+    if fade_entry_idx < len(path):
+        triggered[2] = True
+        fade_entry_p = path[fade_entry_idx]
+        fade_stop_p = direction_sign * (extreme[fade_entry_idx] + 2.0) # Peak + 2pt / Trough - 2pt
+        # The fade trades against the breakout, so its profit is -move from fade_entry_p
+        fade_move = -direction_sign * (path[np.searchsorted(path_times, path_times[fade_entry_idx]):] - fade_entry_p)
+        i_t = _first_true(fade_move >= 15.0)
+        i_s = _first_true(fade_move <= -direction_sign * (fade_stop_p - fade_entry_p))
+
+        if i_t < i_s: pnl[2] = 15.0
+        elif i_s < i_t: pnl[2] = direction_sign * (fade_entry_p - fade_stop_p)
+        else: pnl[2] = -direction_sign * (path[-1] - fade_entry_p)
+
+    # --- S4: Time-Based Exit (30/25 Baseline) ---
+    triggered[3] = True
+    i_t = _first_true(move >= 30.0)
+    i_s = _first_true(move <= -25.0)
+
+    # Time stop: first tick at/after 11:30 AM ET still short of 5 pts profit
+    t0 = np.searchsorted(path_times, time_stop_ns)
+    i_time = t0 + _first_true(move[t0:] < 5.0)
+
+    # Target and stop are checked before the time stop on the same tick
+    exit_i = min(i_t, i_s, i_time)
+    if exit_i == len(path): pnl[3] = final_move
+    elif exit_i == i_t: pnl[3] = 30.0
+    elif exit_i == i_s: pnl[3] = -25.0
+    else: pnl[3] = move[i_time]
+
+    # --- S5: Master Alpha (S1 + S4) ---
+    # Same exits as S4, restricted to the S1 volatility filter
+    if narrow:
+        triggered[4] = True
+        pnl[4] = pnl[3]
+
+    return pnl, triggered
+
+_run_strategies = _run_strategies_jit if NUMBA_AVAILABLE else _run_strategies_numpy
+
+def session_bounds_ns(day_starts):
+    """
+    Session boundaries for each New York trading day, as int64 UTC epoch ns.
+
+    day_starts is a naive DatetimeIndex of local midnights. Returns a dict of
+    arrays aligned with it: session_start (09:30), or_end (09:30:30),
+    fade_start (10:00), time_stop (11:30) and session_end (16:00).
+    """
+    def at(**offset):
+        local = day_starts + pd.Timedelta(**offset)
+        return local.tz_localize('US/Eastern').as_unit('ns').asi8
 
-    # post_or_slice starts strictly AFTER the OR
-    post_or_slice = day_data[(day_data.index > or_end_time) & (day_data.index <= session_end)]
+    return {
+        'session_start': at(hours=9, minutes=30),
+        'or_end': at(hours=9, minutes=30, seconds=30),
+        'fade_start': at(hours=10),
+        'time_stop': at(hours=11, minutes=30),
+        'session_end': at(hours=16),
+    }
 
-    if or_slice.empty or rth_slice.empty:
-        return None
+# One record per day from _day_stats. pnl/triggered are indexed S1..S5;
+# triggered is uint8 because Numba can't store bool sub-arrays in records.
+DAY_RESULT_DTYPE = np.dtype([
+    ('valid', np.bool_),        # False when the day has no 09:30 opening range
+    ('direction', np.int8),     # +1 Long, -1 Short, 0 no breakout (Inside)
+    ('or_high', np.float64),
+    ('or_low', np.float64),
+    ('daily_high', np.float64),
+    ('daily_low', np.float64),
+    ('mfe', np.float64),
+    ('mae', np.float64),
+    ('pnl', np.float64, (5,)),
+    ('triggered', np.uint8, (5,)),
+])
+
+@njit(cache=True)
+def _day_stats(prices, times_ns, session_start_ns, or_end_ns, fade_start_ns, time_stop_ns, session_end_ns):
+    """
+    Whole-day kernel: session slicing, OR/RTH levels, first breakout, S1-S5 and
+    MFE/MAE over one day's ticks. Returns a 1-element DAY_RESULT_DTYPE array.
+    """
+    out = np.zeros(1, dtype=DAY_RESULT_DTYPE)
+    res = out[0]
+    if len(prices) < 2:
+        return out
+
+    # Ticks are time-sorted, so session boundaries are binary searches into times_ns
+    i_open = np.searchsorted(times_ns, session_start_ns, side='left')
+    i_or_end = np.searchsorted(times_ns, or_end_ns, side='right')
+    i_close = np.searchsorted(times_ns, session_end_ns, side='right')
+
+    # 1. Opening Range (Exactly 9:30:00 to 9:30:30) and RTH (9:30:00 to 16:00:00)
+    if i_or_end <= i_open:
+        return out
 
     # 2. Determine Levels
-    or_high = or_slice['Price'].max()
-    or_low = or_slice['Price'].min()
+    or_high = prices[i_open:i_or_end].max()
+    or_low = prices[i_open:i_or_end].min()
     or_width = or_high - or_low
-    daily_high = rth_slice['Price'].max()
-    daily_low = rth_slice['Price'].min()
-
-    # 3. Find First Breakout
-    break_up_mask = post_or_slice['Price'] > or_high
-    break_down_mask = post_or_slice['Price'] < or_low
-
-    t_up = post_or_slice.index[break_up_mask].min() if break_up_mask.any() else pd.NaT
-    t_down = post_or_slice.index[break_down_mask].min() if break_down_mask.any() else pd.NaT
-
-    direction = None
-    entry_time = None
-    entry_price = 0.0
-
-    if pd.notna(t_up) and pd.notna(t_down):
-        if t_up < t_down:
-            direction = 'Long'
-            entry_time = t_up
-            entry_price = or_high
-        else:
-            direction = 'Short'
-            entry_time = t_down
-            entry_price = or_low
-    elif pd.notna(t_up):
-        direction = 'Long'
-        entry_time = t_up
+    res['valid'] = True
+    res['or_high'] = or_high
+    res['or_low'] = or_low
+
+    # post-OR ticks start strictly AFTER the OR. RTH is OR + post-OR, so the
+    # daily extremes extend the OR levels instead of rescanning the session.
+    post_prices = prices[i_or_end:i_close]
+    post_times = times_ns[i_or_end:i_close]
+    res['daily_high'] = or_high
+    res['daily_low'] = or_low
+    if len(post_prices) == 0:
+        return out
+    res['daily_high'] = max(or_high, post_prices.max())
+    res['daily_low'] = min(or_low, post_prices.min())
+
+    # 3. Find First Breakout. The earlier timestamp wins; a tie goes Short.
+    i_up = np.argmax(post_prices > or_high)
+    i_down = np.argmax(post_prices < or_low)
+    broke_up = post_prices[i_up] > or_high
+    broke_down = post_prices[i_down] < or_low
+
+    if broke_up and (not broke_down or post_times[i_up] < post_times[i_down]):
+        direction_sign = 1
+        entry_time = post_times[i_up]
         entry_price = or_high
-    elif pd.notna(t_down):
-        direction = 'Short'
-        entry_time = t_down
+    elif broke_down:
+        direction_sign = -1
+        entry_time = post_times[i_down]
         entry_price = or_low
+    else:
+        return out
+
+    # 4. Strategy Analysis. Ticks sharing the entry timestamp are part of the trade.
+    entry_idx = np.searchsorted(post_times, entry_time, side='left')
+    pnl, triggered = _run_strategies(
+        post_prices, post_times, entry_idx, entry_price, direction_sign,
+        or_width, fade_start_ns, time_stop_ns
+    )
+    res['direction'] = direction_sign
+    res['pnl'][:] = pnl
+    res['triggered'][:] = triggered
+
+    # --- MFE/MAE ---
+    move = direction_sign * (post_prices[entry_idx:] - entry_price)
+    res['mfe'] = max(0.0, move.max())
+    res['mae'] = max(0.0, -move.min())
+    return out
+
+# Strategy column prefixes, in the order of the kernel's pnl/triggered arrays
+STRATEGY_COLUMNS = ['S1_Vol', 'S2_Short', 'S3_Fade', 'S4_Time', 'S5_Master']
+
+# One row per traded day; process_file returns these and run_risk_analysis
+# concatenates them into the results table.
+RESULT_DTYPE = np.dtype(
+    [('Date', 'datetime64[D]'), ('Direction', 'U5'),
+     ('OR_High', 'f8'), ('OR_Low', 'f8'), ('OR_Width', 'f8'),
+     ('Daily_High', 'f8'), ('Daily_Low', 'f8'), ('MFE', 'f8'), ('MAE', 'f8')]
+    + [(f'{s}_{kind}', dt) for s in STRATEGY_COLUMNS for kind, dt in (('PnL', 'f8'), ('Trig', '?'))]
+)
+
+def get_trade_stats(prices, times_ns, session_start_ns, or_end_ns,
+                    fade_start_ns, time_stop_ns, session_end_ns):
+    """
+    Computes OR levels and S1-S5 results for one day.
+
+    prices and times_ns are the day's ticks as float64 / int64 (UTC epoch ns)
+    arrays in time order; the *_ns arguments are that day's session boundaries
+    from session_bounds_ns. Returns the DAY_RESULT_DTYPE record (direction 0
+    for an inside day), or None when the day has no opening range.
+    """
+    res = _day_stats(prices, times_ns, session_start_ns, or_end_ns,
+                     fade_start_ns, time_stop_ns, session_end_ns)[0]
+    return res if res['valid'] else None
+
+def _trades_from_day_stats(day_stats, dates):
+    """Builds RESULT_DTYPE rows for the traded days in a DAY_RESULT_DTYPE array."""
+    traded = day_stats['valid'] & (day_stats['direction'] != 0)
+    stats = day_stats[traded]
+
+    trades = np.empty(len(stats), dtype=RESULT_DTYPE)
+    trades['Date'] = dates[traded]
+    trades['Direction'] = np.where(stats['direction'] > 0, 'Long', 'Short')
+    trades['OR_High'] = stats['or_high']
+    trades['OR_Low'] = stats['or_low']
+    trades['OR_Width'] = stats['or_high'] - stats['or_low']
+    trades['Daily_High'] = stats['daily_high']
+    trades['Daily_Low'] = stats['daily_low']
+    trades['MFE'] = stats['mfe']
+    trades['MAE'] = stats['mae']
+    for k, name in enumerate(STRATEGY_COLUMNS):
+        trades[f'{name}_PnL'] = stats['pnl'][:, k]
+        trades[f'{name}_Trig'] = stats['triggered'][:, k] != 0
+    return trades
 
-    # 4. Strategy Analysis
-    mfe = 0.0
-    mae = 0.0
-
-    # Strat 1: Vol Filter
-    vol_filter_pnl = 0.0
-    vol_filter_triggered = False
-
-    # Strat 2: Short Bias
-    short_bias_pnl = 0.0
-    short_bias_triggered = False
-
-    # Strat 3: Deep Heat Fade (Peak Reversion)
-    fade_pnl = 0.0
-    fade_triggered = False
-
-    # Strat 4: Time-Based Exit
-    time_exit_pnl = 0.0
-    time_exit_triggered = False
-
-    # Strat 5: Master Alpha (S1 + S4)
-    master_pnl = 0.0
-    master_triggered = False
-
-    if direction:
-        trade_path = post_or_slice[post_or_slice.index >= entry_time]
-        if not trade_path.empty:
-            # --- S1: Volatility Filter (< 5pt OR, 15/15) ---
-            if or_width < 5.0:
-                vol_filter_triggered = True
-                hit_t = False; hit_s = False
-                for p in trade_path['Price']:
-                    if direction == 'Long':
-                        if p >= entry_price + 15.0: hit_t = True; break
-                        if p <= entry_price - 15.0: hit_s = True; break
-                    else:
-                        if p <= entry_price - 15.0: hit_t = True; break
-                        if p >= entry_price + 15.0: hit_s = True; break
-                vol_filter_pnl = 15.0 if hit_t else (-15.0 if hit_s else ((trade_path['Price'].iloc[-1]-entry_price if direction=='Long' else entry_price-trade_path['Price'].iloc[-1])))
-
-            # --- S2: Short Bias Momentum (Filtered & Confirmed) ---
-            # 1. Only trade if or_width < 5.0
-            # 2. Entry at or_low - 2.0 (Momentum Confirmation)
-            # 3. Target: 30.0 pts | Stop: 15.0 pts
-            if direction == 'Short' and or_width < 5.0:
-                # Find the specific entry time for the 2.0pt buffer
-                s2_entry_price = or_low - 2.0
-                s2_entry_idx = trade_path.index[trade_path['Price'] <= s2_entry_price].min()
-
-                if pd.notna(s2_entry_idx):
-                    short_bias_triggered = True
-                    s2_path = post_or_slice[post_or_slice.index >= s2_entry_idx]
-
-                    s2_hit_t = False; s2_hit_s = False
-                    for p in s2_path['Price']:
-                        if p <= s2_entry_price - 30.0: s2_hit_t = True; break
-                        if p >= s2_entry_price + 15.0: s2_hit_s = True; break
-
-                    short_bias_pnl = 30.0 if s2_hit_t else (-15.0 if s2_hit_s else (s2_entry_price - s2_path['Price'].iloc[-1]))
-
-            # --- S3: Stretched Fade ---
-            # 1. Must move 3.0x OR Width from Entry
-            # 2. Must happen after 10:00 AM ET
-            # 3. Trigger is 1.0x OR Width reversal from peak/trough
-            fade_start_time = session_start.replace(hour=10, minute=0, second=0)
-            extension_reached = False
-            extreme_price = trade_path['Price'].iloc[0]
-
-            fade_entry_idx = None
-            fade_entry_p = 0.0
-            fade_stop_p = 0.0
-
-            trigger_dist = max(5.0, or_width) # Minimum 5pt trigger to avoid noise on tiny ranges
-            min_stretch = or_width * 3.0
-
-            for t, p in trade_path['Price'].items():
-                if direction == 'Long':
-                    extreme_price = max(extreme_price, p)
-                    if not extension_reached and p >= entry_price + min_stretch:
-                        extension_reached = True
-
-                    if extension_reached and t >= fade_start_time:
-                        if p <= extreme_price - trigger_dist:
-                            fade_entry_idx = t
-                            fade_entry_p = p
-                            fade_stop_p = extreme_price + 2.0 # Peak + 2pt
-                            break
-                else: # Short
-                    extreme_price = min(extreme_price, p)
-                    if not extension_reached and p <= entry_price - min_stretch:
-                        extension_reached = True
-
-                    if extension_reached and t >= fade_start_time:
-                        if p >= extreme_price + trigger_dist:
-                            fade_entry_idx = t
-                            fade_entry_p = p
-                            fade_stop_p = extreme_price - 2.0 # Trough - 2pt
-                            break
-
-            if fade_entry_idx:
-                fade_triggered = True
-                fade_path = post_or_slice[post_or_slice.index >= fade_entry_idx]
-                f_hit_t = False; f_hit_s = False
-                for fp in fade_path['Price']:
-                    if direction == 'Long': # Entering SHORT
-                        if fp <= fade_entry_p - 15.0: f_hit_t = True; break
-                        if fp >= fade_stop_p: f_hit_s = True; break
-                    else: # Entering LONG
-                        if fp >= fade_entry_p + 15.0: f_hit_t = True; break
-                        if fp <= fade_stop_p: f_hit_s = True; break
-
-                if f_hit_t: fade_pnl = 15.0
-                elif f_hit_s: fade_pnl = (fade_entry_p - fade_stop_p) if direction == 'Long' else (fade_stop_p - fade_entry_p)
-                else:
-                    final_p = trade_path['Price'].iloc[-1]
-                    fade_pnl = (fade_entry_p - final_p) if direction == 'Long' else (final_p - fade_entry_p)
-
-            # --- S4: Time-Based Exit (30/25 Baseline) ---
-            time_exit_triggered = True
-            hit_t = False; hit_s = False; time_out = False
-            exit_p = 0.0
-            for t, p in trade_path['Price'].items():
-                # Check target/stop first
-                if direction == 'Long':
-                    if p >= entry_price + 30.0: hit_t = True; exit_p = entry_price + 30.0; break
-                    if p <= entry_price - 25.0: hit_s = True; exit_p = entry_price - 25.0; break
-                else:
-                    if p <= entry_price - 30.0: hit_t = True; exit_p = entry_price - 30.0; break
-                    if p >= entry_price + 25.0: hit_s = True; exit_p = entry_price + 25.0; break
-
-                # Check time stop: 11:30 AM ET
-                if t >= time_stop_limit:
-                    curr_profit = (p - entry_price) if direction == 'Long' else (entry_price - p)
-                    if curr_profit < 5.0:
-                        time_out = True
-                        exit_p = p
-                        break
-
-            if hit_t: time_exit_pnl = 30.0
-            elif hit_s: time_exit_pnl = -25.0
-            elif time_out: time_exit_pnl = (exit_p - entry_price) if direction == 'Long' else (entry_price - exit_p)
-            else: time_exit_pnl = (trade_path['Price'].iloc[-1]-entry_price if direction=='Long' else entry_price-trade_path['Price'].iloc[-1])
-
-            # --- S5: Master Alpha (S1 + S4) ---
-            if or_width < 5.0:
-                master_triggered = True
-                m_hit_t = False; m_hit_s = False; m_time_out = False
-                m_exit_p = 0.0
-                for t, p in trade_path['Price'].items():
-                    if direction == 'Long':
-                        if p >= entry_price + 30.0: m_hit_t = True; m_exit_p = entry_price + 30.0; break
-                        if p <= entry_price - 25.0: m_hit_s = True; m_exit_p = entry_price - 25.0; break
-                    else:
-                        if p <= entry_price - 30.0: m_hit_t = True; m_exit_p = entry_price - 30.0; break
-                        if p >= entry_price + 25.0: m_hit_s = True; m_exit_p = entry_price - 25.0; break
-
-                    if t >= time_stop_limit:
-                        m_curr_profit = (p - entry_price) if direction == 'Long' else (entry_price - p)
-                        if m_curr_profit < 5.0:
-                            m_time_out = True
-                            m_exit_p = p
-                            break
-                if m_hit_t: master_pnl = 30.0
-                elif m_hit_s: master_pnl = -25.0
-                elif m_time_out: master_pnl = (m_exit_p - entry_price) if direction == 'Long' else (entry_price - m_exit_p)
-                else: master_pnl = (trade_path['Price'].iloc[-1]-entry_price if direction=='Long' else entry_price-trade_path['Price'].iloc[-1])
-
-            # --- MFE/MAE ---
-            path_high = trade_path['Price'].max()
-            path_low = trade_path['Price'].min()
-            if direction == 'Long':
-                mfe = path_high - entry_price
-                mae = entry_price - path_low
-            else:
-                mfe = entry_price - path_low
-                mae = path_high - entry_price
+def _trades_from_frame(df):
+    """Converts a results DataFrame (e.g. from the Parquet cache) back to RESULT_DTYPE rows."""
+    trades = np.empty(len(df), dtype=RESULT_DTYPE)
+    for name in RESULT_DTYPE.names:
+        trades[name] = df[name].to_numpy()
+    return trades
 
-    return {
-        'Date': current_date,
-        'Direction': direction,
-        'OR_High': or_high,
-        'OR_Low': or_low,
-        'OR_Width': or_width,
-        'Daily_High': daily_high,
-        'Daily_Low': daily_low,
-        'MFE': max(0.0, mfe),
-        'MAE': max(0.0, mae),
-        'S1_Vol_PnL': vol_filter_pnl,
-        'S1_Vol_Trig': vol_filter_triggered,
-        'S2_Short_PnL': short_bias_pnl,
-        'S2_Short_Trig': short_bias_triggered,
-        'S3_Fade_PnL': fade_pnl,
-        'S3_Fade_Trig': fade_triggered,
-        'S4_Time_PnL': time_exit_pnl,
-        'S4_Time_Trig': time_exit_triggered,
-        'S5_Master_PnL': master_pnl,
-        'S5_Master_Trig': master_triggered
-    }
+def _find_h5py_tick_group(f, key):
+    """Returns the group holding the h5py fallback layout (values/columns/index), or None."""
+    import h5py
+    candidates = [key, 'ticks', 'data'] + list(f.keys())
+    for k in candidates:
+        g = f.get(k)
+        if isinstance(g, h5py.Group) and all(name in g for name in ('values', 'columns', 'index')):
+            return g
+    return None
+
+def load_tick_arrays(filepath, key='ticks'):
+    """
+    Loads a tick file as (prices float64, times_ns int64 UTC epoch ns) arrays.
+
+    Files written by the h5py fallback (values/columns/index datasets) are read
+    directly with h5py, pulling only the Price (or Close) column. Anything else,
+    e.g. the PyTables 'table' format, goes through pd.read_hdf.
+    """
+    try:
+        import h5py
+    except ImportError:
+        h5py = None
+
+    if h5py is not None:
+        with h5py.File(filepath, 'r', rdcc_nbytes=H5_CACHE_BYTES,
+                       rdcc_nslots=H5_CACHE_SLOTS, rdcc_w0=1.0) as f:
+            g = _find_h5py_tick_group(f, key)
+            if g is not None:
+                cols = [c.decode('utf-8') if isinstance(c, bytes) else c for c in g['columns'][:]]
+                c = cols.index('Price') if 'Price' in cols else cols.index('Close')
+                prices = g['values'][:, c].astype(np.float64, copy=False)
+                times_ns = g['index'][:].astype(np.int64, copy=False)
+                return prices, times_ns
+
+    df = pd.read_hdf(filepath, key=key)
+
+    # Standardize Columns
+    if 'Price' not in df.columns and 'Close' in df.columns:
+        df['Price'] = df['Close']
+
+    if not isinstance(df.index, pd.DatetimeIndex):
+        for col in ['Timestamp', 'Date', 'DateTime']:
+            if col in df.columns:
+                df.set_index(col, inplace=True)
+                break
+        df.index = pd.to_datetime(df.index)
+
+    if df.index.tz is None:
+        df.index = df.index.tz_localize('UTC')
+    return df['Price'].to_numpy(dtype=np.float64), df.index.tz_convert('UTC').as_unit('ns').asi8
 
 def process_file(filepath):
     print(f"Processing: {os.path.basename(filepath)}...")
-    trades = []
     start_time = time.perf_counter()
 
     try:
-        # Check if we can read with pytables
-        try:
-            df = pd.read_hdf(filepath, key='ticks')
-        except Exception as e:
-            # Fallback to h5py for direct reading
-            import h5py
-            with h5py.File(filepath, 'r') as f:
-                # Look for 'ticks' group or similar
-                key = 'ticks' if 'ticks' in f else ('data' if 'data' in f else None)
-                if not key:
-                    # Search for any group with 'values', 'columns', 'index'
-                    for k in f.keys():
-                        if isinstance(f[k], h5py.Group) and 'values' in f[k]:
-                            key = k
-                            break
-
-                if key:
-                    g = f[key]
-                    data = g['values'][:]
-                    cols = [c.decode('utf-8') if isinstance(c, bytes) else c for c in g['columns'][:]]
-                    idx = g['index'][:]
-                    df = pd.DataFrame(data, columns=cols, index=pd.to_datetime(idx, unit='ns', utc=True))
-                else:
-                    print(f"  Error: No valid keys found in {filepath}. Ensure it's a valid HDF5 file.")
-                    return []
-
-        # Standardize Columns
-        if 'Price' not in df.columns and 'Close' in df.columns:
-            df['Price'] = df['Close']
-
-        if not isinstance(df.index, pd.DatetimeIndex):
-            for col in ['Timestamp', 'Date', 'DateTime']:
-                if col in df.columns:
-                    df.set_index(col, inplace=True)
-                    break
-            df.index = pd.to_datetime(df.index)
-
-        # IMPORTANT: Convert to US/Eastern to align with RTH Open (9:30 AM ET)
-        if df.index.tz is None:
-            df.index = df.index.tz_localize('UTC')
-        df.index = df.index.tz_convert('US/Eastern')
+        prices_all, times_all = load_tick_arrays(filepath)
+        if len(times_all) == 0:
+            return np.empty(0, dtype=RESULT_DTYPE)
 
-        if df.empty:
-            return []
+        # Session slicing binary-searches the timestamps, which needs time order
+        if not (times_all[1:] >= times_all[:-1]).all():
+            order = np.argsort(times_all, kind='stable')
+            prices_all = prices_all[order]
+            times_all = times_all[order]
 
-        # Split into days based on Local New York Date
-        grouped = df.groupby(df.index.date)
+        # IMPORTANT: Convert to US/Eastern to align with RTH Open (9:30 AM ET)
+        local_index = pd.to_datetime(times_all, unit='ns', utc=True).tz_convert('US/Eastern')
+
+        # Split into days based on Local New York Date. The ticks are sorted, so each
+        # day is a contiguous run; find where the normalized date changes.
+        local_days = local_index.normalize()
+        day_keys = local_days.asi8
+        day_bounds = np.concatenate(([0], np.flatnonzero(np.diff(day_keys)) + 1, [len(times_all)]))
+        num_days = len(day_bounds) - 1
         skipped_count = 0
 
-        print(f"  {'Date':<12} | {'Direction':<10} | {'30s OR High/Low':<28} | {'Daily High/Low':<28}")
-        print(f"  {'-'*12}-+-{'-'*10}-+-{'-'*28}-+-{'-'*28}")
+        # Per-day table rows are collected and written in one print per file
+        table = [
+            f"  {'Date':<12} | {'Direction':<10} | {'30s OR High/Low':<28} | {'Daily High/Low':<28}",
+            f"  {'-'*12}-+-{'-'*10}-+-{'-'*28}-+-{'-'*28}",
+        ]
 
-        for date, day_data in grouped:
-            stat = get_trade_stats(day_data)
-            if stat:
-                dir_label = stat['Direction'] if stat['Direction'] else 'Inside'
-                if stat['Direction']:
-                    trades.append(stat)
-                else:
+        day_starts = local_days[day_bounds[:-1]].tz_localize(None)
+        day_dates = day_starts.values.astype('datetime64[D]')
+        bounds = session_bounds_ns(day_starts)
+        day_stats = np.zeros(num_days, dtype=DAY_RESULT_DTYPE)
+
+        for d, (a, b) in enumerate(zip(day_bounds[:-1], day_bounds[1:])):
+            stat = get_trade_stats(
+                prices_all[a:b], times_all[a:b],
+                bounds['session_start'][d], bounds['or_end'][d], bounds['fade_start'][d],
+                bounds['time_stop'][d], bounds['session_end'][d]
+            )
+            if stat is not None:
+                day_stats[d] = stat
+                direction = int(stat['direction'])
+                dir_label = 'Long' if direction > 0 else ('Short' if direction < 0 else 'Inside')
+                if not direction:
                     skipped_count += 1
 
-                or_str = f"{stat['OR_High']:>7.2f} / {stat['OR_Low']:<7.2f}"
-                day_str = f"{stat['Daily_High']:>7.2f} / {stat['Daily_Low']:<7.2f}"
-                print(f"  {str(date):<12} | {dir_label:<10} | {or_str:<28} | {day_str:<28}")
+                or_str = f"{stat['or_high']:>7.2f} / {stat['or_low']:<7.2f}"
+                day_str = f"{stat['daily_high']:>7.2f} / {stat['daily_low']:<7.2f}"
+                table.append(f"  {str(day_dates[d]):<12} | {dir_label:<10} | {or_str:<28} | {day_str:<28}")
             else:
                 skipped_count += 1
 
+        print("\n".join(table))
+        trades = _trades_from_day_stats(day_stats, day_dates)
+
         end_time = time.perf_counter()
-        print(f"  Processed {len(grouped)} days in {end_time - start_time:.2f}s")
+        print(f"  Processed {num_days} days in {end_time - start_time:.2f}s")
 
-        del df
+        del prices_all, times_all, local_index, local_days
         gc.collect()
 
     except Exception as e:
         print(f"Error: {e}")
+        return None
 
     return trades
 
-def run_risk_analysis():
-    all_trades = []
+def _trade_cache_path(filepath):
+    key = f"{os.path.abspath(filepath)}{os.path.getmtime(filepath)}{CONFIG_HASH}"
+    return os.path.join(CACHE_DIR, f"{hashlib.sha256(key.encode()).hexdigest()}.parquet")
+
+def load_cached_trades(filepath):
+    """Returns the cached RESULT_DTYPE trades for filepath, or None if there is no fresh entry."""
+    if not PARQUET_AVAILABLE:
+        return None
+    cache_path = _trade_cache_path(filepath)
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        return _trades_from_frame(pd.read_parquet(cache_path))
+    except Exception as e:
+        print(f"Warning: Ignoring unreadable cache entry {cache_path}: {e}")
+        return None
+
+def save_cached_trades(filepath, trades):
+    if not PARQUET_AVAILABLE:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        pd.DataFrame(trades).to_parquet(_trade_cache_path(filepath), index=False)
+    except Exception as e:
+        print(f"Warning: Could not cache trades for {os.path.basename(filepath)}: {e}")
+
+def _process_file_buffered(filepath):
+    """Pool worker: runs process_file and returns (trades, captured console output)."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        trades = process_file(filepath)
+    return trades, buf.getvalue()
+
+def run_risk_analysis(export_csv=False):
+    trade_arrays = []
     files = glob.glob(FILE_PATTERN)
     print(f"Found {len(files)} files.")
+
+    results = {}
     for f in files:
-        all_trades.extend(process_file(f))
+        trades = load_cached_trades(f)
+        if trades is not None:
+            results[f] = (trades, f"Processing: {os.path.basename(f)}... cached ({len(trades)} trades)\n")
+    pending = [f for f in files if f not in results]
+
+    if len(pending) > 1:
+        # Files are independent; run one per core. Each worker's day table is
+        # buffered and printed in file order so the output doesn't interleave.
+        workers = min(len(pending), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results.update(zip(pending, ex.map(_process_file_buffered, pending)))
+    else:
+        results.update((f, _process_file_buffered(f)) for f in pending)
 
-    if not all_trades:
+    for f in files:
+        trades, output = results[f]
+        print(output, end='')
+        if trades is None:
+            continue
+        if f in pending:
+            save_cached_trades(f, trades)
+        trade_arrays.append(trades)
+
+    all_trades = np.concatenate(trade_arrays) if trade_arrays else np.empty(0, dtype=RESULT_DTYPE)
+    if len(all_trades) == 0:
         print("\nNo trades found.")
         return
 
@@ -382,12 +633,15 @@ def run_risk_analysis():
             ('S5: Master (S1 + S4)', 'S5_Master_PnL', 'S5_Master_Trig')
         ]
 
-        for name, pnl_col, trig_col in strats:
-            triggered = df[df[trig_col] == True]
-            n = len(triggered)
+        # One (trades x strategies) reduction instead of filtering df per strategy
+        pnl = df[[pnl_col for _, pnl_col, _ in strats]].to_numpy(dtype=np.float64)
+        trig = df[[trig_col for _, _, trig_col in strats]].to_numpy(dtype=bool)
+        counts = trig.sum(axis=0)
+        win_counts = (trig & (pnl > 0)).sum(axis=0)
+        totals = np.where(trig, pnl, 0.0).sum(axis=0)
+
+        for (name, _, _), n, wins, total_pts in zip(strats, counts, win_counts, totals):
             if n > 0:
-                wins = len(triggered[triggered[pnl_col] > 0])
-                total_pts = triggered[pnl_col].sum()
                 wr = (wins / n) * 100
                 avg = total_pts / n
                 print(f"{name:<25} | {wr:<12.1f} | {total_pts:<12.2f} | {avg:<10.2f} | {n:<10}")
@@ -402,23 +656,34 @@ def run_risk_analysis():
         print("="*80)
         print(f"{'Target':<8} | {'Win Rate':<10} | {'Avg MAE (Heat)':<15} | {'90% Safe Stop':<15}")
         print("-" * 80)
-        for target in TARGETS:
-            winners = df[df['MFE'] >= target]
-            if winners.empty:
+        # Sorted by MFE, the winners for each target are a suffix of the arrays
+        order = np.argsort(df['MFE'].to_numpy(), kind='stable')
+        mfe = df['MFE'].to_numpy()[order]
+        mae = df['MAE'].to_numpy()[order]
+        starts = np.searchsorted(mfe, TARGETS, side='left')
+        for target, start in zip(TARGETS, starts):
+            winners_mae = mae[start:]
+            if len(winners_mae) == 0:
                 print(f"{target:<8} | 0.0%       | N/A             | N/A")
                 continue
-            win_rate = (len(winners) / total) * 100
-            avg_heat = winners['MAE'].mean()
-            safe_stop = np.percentile(winners['MAE'], 90)
+            win_rate = (len(winners_mae) / total) * 100
+            avg_heat = winners_mae.mean()
+            safe_stop = np.percentile(winners_mae, 90)
             print(f"{target:<8} | {win_rate:<9.1f}% | {avg_heat:<15.2f} | {safe_stop:<15.2f}")
 
     print_stats_table(df[df['Direction'] == 'Long'], "LONG BREAKOUT ANALYSIS")
     print_stats_table(df[df['Direction'] == 'Short'], "SHORT BREAKOUT ANALYSIS")
     print_strategy_comparison(df)
 
-    output_file = "backtest_results.csv"
-    df.to_csv(output_file, index=False)
-    print(f"\nFull results exported to {output_file}")
+    # Parquet by default; CSV on request (--csv) or when pyarrow is missing
+    if PARQUET_AVAILABLE:
+        output_file = "backtest_results.parquet"
+        df.to_parquet(output_file, engine='pyarrow', compression='zstd', index=False)
+        print(f"\nFull results exported to {output_file}")
+    if export_csv or not PARQUET_AVAILABLE:
+        output_file = "backtest_results.csv"
+        df.to_csv(output_file, index=False)
+        print(f"\nFull results exported to {output_file}")
 
 if __name__ == "__main__":
-    run_risk_analysis()
\ No newline at end of file
+    run_risk_analysis(export_csv="--csv" in sys.argv[1:])
\ No newline at end of file
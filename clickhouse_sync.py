@@ -5,23 +5,78 @@ Imports SCID tick data into ClickHouse with pipeline parallelism
 for maximum ingest speed.
 """
 
-import json
+import atexit
+import os
+import queue
+import sys
 import time
 import threading
-import queue
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 import datetime
 
-from parser import SCIDParser
-from clickhouse_manager import ClickHouseManager, ClickHouseConfig
+import numpy as np
+
+from parser import SCIDParser, RECORD_DTYPE
+from clickhouse_manager import ClickHouseManager, ClickHouseConfig, DEFAULT_BLOCK_ROWS
 from config import Config
+import json_compat
+
+# Completed contracts between checkpoint saves within a symbol
+CHECKPOINT_SAVE_EVERY = 16
+
+# Seconds between progress lines per contract
+PROGRESS_TICK = 1.0
+
+_progress_q: "queue.SimpleQueue" = queue.SimpleQueue()
+_progress_thread: Optional[threading.Thread] = None
+_progress_lock = threading.Lock()
+
+
+def _progress_logger() -> None:
+    """Print the latest row count of each active contract once per tick."""
+    latest: Dict = {}
+    next_tick = time.monotonic() + PROGRESS_TICK
+    while True:
+        timeout = next_tick - time.monotonic()
+        if timeout > 0:
+            try:
+                symbol, filename, count = _progress_q.get(timeout=timeout)
+                latest[(symbol, filename)] = count
+                continue
+            except queue.Empty:
+                pass
+
+        if latest:
+            lines = "".join(
+                f"[{symbol}] {filename}: {count:,} rows processed\n"
+                for (symbol, filename), count in latest.items()
+            )
+            latest.clear()
+            sys.stdout.flush()  # Keep ordering with earlier print() output
+            os.write(sys.stdout.fileno(), lines.encode())
+        next_tick = time.monotonic() + PROGRESS_TICK
+
+
+def report_progress(symbol: str, filename: str, count: int) -> None:
+    """Queue a progress update; formatting and output happen on the logger thread."""
+    global _progress_thread
+    if _progress_thread is None:
+        with _progress_lock:
+            if _progress_thread is None:
+                _progress_thread = threading.Thread(target=_progress_logger, daemon=True)
+                _progress_thread.start()
+    _progress_q.put((symbol, filename, count))
 
 
 class ClickHouseCheckpoint:
     """
     Manages checkpoint state for incremental imports to ClickHouse.
-    Tracks last position per file to support resumable imports.
+    Tracks which (symbol, contract file) pairs have been fully imported, so
+    later runs skip them.
     """
 
     def __init__(self, checkpoint_path: str = None):
@@ -29,58 +84,143 @@ class ClickHouseCheckpoint:
             checkpoint_path = Path(__file__).parent / "checkpoint_clickhouse.json"
 
         self.path = Path(checkpoint_path)
-        self._data: Dict = {}
+        self.log_path = self.path.with_name(self.path.name + ".log")
+        # (symbol, filename) -> completed
+        self._data: Dict[Tuple[str, str], bool] = {}
+        self._name_cache: Dict[str, str] = {}
+        self._log = None
+        # Symbols sync on separate threads but share one checkpoint
+        self._lock = threading.Lock()
         self.load()
 
     def load(self) -> None:
+        """Read the JSON snapshot, replay the update log on top and compact."""
+        self._data = {}
         if self.path.exists():
-            with open(self.path, 'r') as f:
-                self._data = json.load(f)
-        else:
-            self._data = {}
+            with open(self.path, 'rb') as f:
+                snapshot = json_compat.loads(f.read())
+            if isinstance(snapshot, dict):
+                # Older nested {symbol: {"files": {filename: {"completed": ...}}}} layout
+                for symbol, sym_data in snapshot.items():
+                    for filename, state in sym_data.get("files", {}).items():
+                        self._data[(symbol, filename)] = state.get("completed", False)
+            else:
+                for symbol, filename, completed in snapshot:
+                    self._data[(symbol, filename)] = completed
+
+        if self.log_path.exists():
+            with open(self.log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json_compat.loads(line)
+                    except json_compat.JSONDecodeError:
+                        break  # Torn last line from an interrupted write
+                    self._apply(entry["sym"], entry["file"], entry["done"])
+            self.compact()
 
     def save(self) -> None:
-        with open(self.path, 'w') as f:
-            json.dump(self._data, f, indent=4)
+        """Updates are appended as they happen; just push them to the OS."""
+        with self._lock:
+            if self._log is not None:
+                self._log.flush()
+
+    def compact(self) -> None:
+        """Fold the update log into the JSON snapshot and truncate it."""
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+            # Write aside and rename over, so a crash leaves the old snapshot
+            # (and the log that still covers it) rather than a torn file
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            snapshot = [[symbol, filename, completed] for (symbol, filename), completed in self._data.items()]
+            tmp_path.write_bytes(json_compat.dumps(snapshot))
+            tmp_path.replace(self.path)
+            open(self.log_path, 'wb').close()
+
+    def _filename(self, file_path: str) -> str:
+        """Checkpoint key for a file (its basename), cached per path."""
+        filename = self._name_cache.get(file_path)
+        if filename is None:
+            filename = self._name_cache[file_path] = os.path.basename(file_path)
+        return filename
+
+    def _apply(self, symbol: str, filename: str, completed: bool) -> None:
+        self._data[(symbol, filename)] = completed
 
     def set_completed(self, symbol: str, file_path: str, completed: bool = True) -> None:
-        filename = Path(file_path).name
-        if symbol not in self._data:
-            self._data[symbol] = {"files": {}}
-        if "files" not in self._data[symbol]:
-            self._data[symbol]["files"] = {}
-        if filename not in self._data[symbol]["files"]:
-            self._data[symbol]["files"][filename] = {}
-        self._data[symbol]["files"][filename]["completed"] = completed
+        filename = self._filename(file_path)
+        with self._lock:
+            self._apply(symbol, filename, completed)
+            if self._log is None:
+                self._log = open(self.log_path, 'ab')
+            # Buffered; save() pushes pending updates out
+            self._log.write(json_compat.dumps({"sym": symbol, "file": filename, "done": completed}) + b"\n")
 
     def is_completed(self, symbol: str, file_path: str) -> bool:
         """Check if a file has already been completed for a symbol."""
-        filename = Path(file_path).name
-        if symbol not in self._data:
-            return False
-        if "files" not in self._data[symbol]:
-            return False
-        if filename not in self._data[symbol]["files"]:
-            return False
-        return self._data[symbol]["files"][filename].get("completed", False)
+        return self._data.get((symbol, self._filename(file_path)), False)
+
+
+def _attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """Attach to a block owned by the parent; the parent alone unlinks it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+
+def parser_worker(
+    contract_file: str,
+    start_date: Optional[datetime.datetime],
+    end_date: Optional[datetime.datetime],
+    batch_size: int,
+    shm_names: List[str],
+    sizes,
+    sem_full: List,
+    sem_empty: List,
+    errors
+) -> None:
+    """
+    Parse process: fills the two shared-memory slots in turn with raw
+    RECORD_DTYPE batches. sizes[slot] holds the row count of a filled slot,
+    and -1 marks the end of the stream.
+    """
+    blocks = [_attach_shared_memory(name) for name in shm_names]
+    slot = 0
+    try:
+        parser = SCIDParser(contract_file)
+        for arr in parser.read_record_arrays(batch_size, start_date=start_date, end_date=end_date):
+            sem_empty[slot].acquire()
+            np.ndarray(len(arr), dtype=RECORD_DTYPE, buffer=blocks[slot].buf)[:] = arr
+            sizes[slot] = len(arr)
+            sem_full[slot].release()
+            slot ^= 1
+    except Exception as e:
+        errors.put(f"{type(e).__name__}: {e}")
+    finally:
+        sem_empty[slot].acquire()
+        sizes[slot] = -1
+        sem_full[slot].release()
+        for block in blocks:
+            block.close()
 
 
 def process_contract(
-    config: ClickHouseConfig,
+    db: ClickHouseManager,
     symbol: str,
     contract_file: str,
-    start_date_str: Optional[str],
-    end_date_str: Optional[str],
+    start_date: Optional[datetime.datetime],
+    end_date: Optional[datetime.datetime],
     batch_size: int,
     table_name: str
 ) -> Dict:
     """
     Process a single contract file with pipeline parallelism.
-    One thread parses while main thread inserts.
+    A child process parses into two shared-memory slots while this thread
+    inserts from the other over db's connection, which the caller owns and
+    reuses across contracts.
     """
-    db = ClickHouseManager(config)
-    db.connect()
-
     stats = {
         "contract": Path(contract_file).name,
         "processed": 0,
@@ -95,78 +235,77 @@ def process_contract(
 
         start_time = time.time()
 
-        # Parse dates
-        s_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc) if start_date_str else None
-        e_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc) if end_date_str else None
-
         print(f"Starting ClickHouse import: {Path(contract_file).name} -> {table_name} (pipelined)")
 
-        # Queue for batches (max 3 batches buffered to limit memory)
-        batch_queue = queue.Queue(maxsize=3)
-        parse_done = threading.Event()
-        parse_error = [None]
-
-        def parser_thread():
-            """Background thread that reads and parses SCID file into batches."""
-            try:
-                parser = SCIDParser(contract_file)
-                batch = []
-                count = 0
-
-                for record in parser.read_records(start_date=s_date, end_date=e_date, buffer_size=256*1024):
-                    batch.append(record.to_db_tuple())
-                    count += 1
-
-                    if len(batch) >= batch_size:
-                        batch_queue.put((batch, count))
-                        batch = []
-
-                # Put remaining batch
-                if batch:
-                    batch_queue.put((batch, count))
-
-            except Exception as e:
-                parse_error[0] = e
-            finally:
-                parse_done.set()
-
-        # Start parser thread
-        parser_t = threading.Thread(target=parser_thread, daemon=True)
-        parser_t.start()
+        # Two batch slots in shared memory: the parser process fills one while
+        # the inserter drains the other, so parsing never contends for our GIL
+        ctx = mp.get_context()
+        blocks = [
+            shared_memory.SharedMemory(create=True, size=batch_size * RECORD_DTYPE.itemsize)
+            for _ in range(2)
+        ]
+        sizes = ctx.Array('q', 2, lock=False)
+        sem_full = [ctx.Semaphore(0), ctx.Semaphore(0)]
+        sem_empty = [ctx.Semaphore(1), ctx.Semaphore(1)]
+        parse_errors = ctx.SimpleQueue()
+        parser = SCIDParser(contract_file)
+
+        parser_p = ctx.Process(
+            target=parser_worker,
+            args=(contract_file, start_date, end_date, batch_size,
+                  [block.name for block in blocks], sizes, sem_full, sem_empty, parse_errors),
+            daemon=True
+        )
+        parser_p.start()
 
         # Main loop consumes batches and inserts
-        last_print = 0
-
-        while True:
-            if parse_done.is_set() and batch_queue.empty():
-                break
-
-            try:
-                batch, count = batch_queue.get(timeout=0.1)
-            except queue.Empty:
-                continue
-
-            stats["processed"] = count
-            inserted = db.insert_records(table_name, batch)
-            stats["inserted"] += inserted
-
-            if stats["processed"] - last_print >= 100000:
-                print(f"[{symbol}] {Path(contract_file).name}: {stats['processed']:,} rows processed")
-                last_print = stats["processed"]
-
-        # Wait for parser thread to finish
-        parser_t.join()
-
-        if parse_error[0]:
-            raise parse_error[0]
+        slot = 0
+        records = columns = None
+
+        try:
+            while True:
+                if not sem_full[slot].acquire(timeout=1.0):
+                    if parser_p.is_alive() or sem_full[slot].acquire(block=False):
+                        continue
+                    raise RuntimeError(f"Parser process exited with code {parser_p.exitcode}")
+                n = sizes[slot]
+                if n < 0:
+                    break
+
+                # Columns are views into the shared slot, so the slot is only
+                # handed back once the insert has consumed them
+                records = np.ndarray(n, dtype=RECORD_DTYPE, buffer=blocks[slot].buf)
+                columns = parser.records_to_columns(records)
+
+                stats["processed"] += n
+                inserted = db.insert_columns(table_name, db.COLUMNS, [columns[name] for name in db.COLUMNS])
+                stats["inserted"] += inserted
+
+                records = columns = None
+                sem_empty[slot].release()
+                slot ^= 1
+
+                report_progress(symbol, stats["contract"], stats["processed"])
+
+            parser_p.join()
+            if not parse_errors.empty():
+                raise RuntimeError(parse_errors.get())
+        finally:
+            # Views must be gone before the blocks can be closed
+            records = columns = None
+            if parser_p.is_alive():
+                # Insert failed mid-stream; the parser may be blocked on a slot
+                parser_p.terminate()
+                parser_p.join()
+            for block in blocks:
+                block.close()
+                block.unlink()
 
         stats["elapsed"] = time.time() - start_time
         print(f"Completed {Path(contract_file).name}: {stats['inserted']:,} inserted in {stats['elapsed']:.2f}s")
 
     except Exception as e:
         print(f"Error processing {contract_file}: {e}")
-    finally:
-        db.close()
 
     return stats
 
@@ -177,18 +316,42 @@ class ClickHouseSync:
     Reads from configured SCID files and inserts into ES/NQ tables.
     """
 
+    # Default checkpoint, loaded once and shared by every instance
+    _default_checkpoint: Optional[ClickHouseCheckpoint] = None
+
     def __init__(self, config: Config = None, checkpoint: ClickHouseCheckpoint = None):
         self.config = config or Config()
-        self.checkpoint = checkpoint or ClickHouseCheckpoint()
+        if checkpoint is None:
+            checkpoint = self._shared_checkpoint()
+        else:
+            atexit.register(checkpoint.save)
+        self.checkpoint = checkpoint
+
+    @classmethod
+    def _shared_checkpoint(cls) -> ClickHouseCheckpoint:
+        if cls._default_checkpoint is None:
+            cls._default_checkpoint = ClickHouseCheckpoint()
+            # Updates between periodic saves still reach disk on Ctrl-C or a
+            # crash that unwinds normally
+            atexit.register(cls._default_checkpoint.save)
+        return cls._default_checkpoint
 
     def sync_symbol(
         self,
         symbol: str,
-        batch_size: int = 100000,
-        progress_interval: int = 100000
+        batch_size: int = DEFAULT_BLOCK_ROWS,
+        progress_interval: int = 100000,
+        parallel_contracts: int = 4
     ) -> Dict:
         """
         Sync all contracts for a symbol.
+
+        Up to parallel_contracts contract files are parsed and inserted at
+        once, each on its own thread and connection.
+
+        batch_size should be a multiple of the native block size
+        (CLICKHOUSE_BLOCK_ROWS, default 65536) so no insert ends in a
+        partially filled block.
         """
         sym_config = self.config.get_symbol_config(symbol)
         if not sym_config:
@@ -204,41 +367,80 @@ class ClickHouseSync:
         start_time = time.time()
 
         # ClickHouse config from app config
+        host = self.config.database.host
         ch_config = ClickHouseConfig(
-            host=self.config.database.host,
+            host=host,
             port=9000,  # ClickHouse native port
+            # Compression only pays off over a real network link
+            compression=None if host in ("localhost", "127.0.0.1", "::1") else "lz4",
         )
 
+        # Round to whole native blocks so the last block of a batch isn't half empty
+        block_rows = ch_config.block_rows
+        if batch_size % block_rows:
+            aligned = max(1, round(batch_size / block_rows)) * block_rows
+            print(f"Batch size {batch_size:,} -> {aligned:,} ({aligned // block_rows} x {block_rows:,}-row blocks)")
+            batch_size = aligned
+
         total_processed = 0
         total_inserted = 0
+        completed = 0
 
+        pending = []
         for contract_cfg in sym_config.contracts:
-            file_path = contract_cfg.file
-
             # Check checkpoint
-            if self.checkpoint.is_completed(symbol, file_path):
-                print(f"Skipping {Path(file_path).name} (already completed)")
+            if self.checkpoint.is_completed(symbol, contract_cfg.file):
+                print(f"Skipping {Path(contract_cfg.file).name} (already completed)")
                 continue
-
-            result = process_contract(
-                ch_config,
+            pending.append(contract_cfg)
+
+        # Each worker thread owns one native connection and reuses it for every
+        # contract it picks up; the native protocol allows one query per
+        # connection, so connections are never shared between threads.
+        local = threading.local()
+        managers = []
+
+        def run_contract(contract_cfg) -> Dict:
+            db = getattr(local, "db", None)
+            if db is None:
+                db = local.db = ClickHouseManager(ch_config)
+                db.connect()
+                managers.append(db)
+            return process_contract(
+                db,
                 symbol,
-                file_path,
+                contract_cfg.file,
                 contract_cfg.start_date,
                 contract_cfg.end_date,
                 batch_size,
                 table_name
             )
 
-            total_processed += result['processed']
-            total_inserted += result['inserted']
-
-            if result['processed'] > 0 and result['inserted'] > 0:
-                # Mark as completed
-                self.checkpoint.set_completed(symbol, file_path, True)
-                self.checkpoint.save()
-            else:
-                print(f"Failed to sync {Path(file_path).name} (no rows inserted)")
+        workers = max(1, min(parallel_contracts, len(pending)))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {pool.submit(run_contract, cfg): cfg for cfg in pending}
+
+                # Checkpoints are only advanced here, on the scheduling thread
+                for future in as_completed(futures):
+                    file_path = futures[future].file
+                    result = future.result()
+
+                    total_processed += result['processed']
+                    total_inserted += result['inserted']
+
+                    if result['processed'] > 0 and result['inserted'] > 0:
+                        # Mark as completed
+                        self.checkpoint.set_completed(symbol, file_path, True)
+                        completed += 1
+                        if completed % CHECKPOINT_SAVE_EVERY == 0:
+                            self.checkpoint.save()
+                    else:
+                        print(f"Failed to sync {Path(file_path).name} (no rows inserted)")
+        finally:
+            self.checkpoint.save()
+            for db in managers:
+                db.close()
 
         elapsed = time.time() - start_time
 
@@ -261,10 +463,26 @@ class ClickHouseSync:
 
         return stats
 
-    def sync_all(self, batch_size: int = 100000) -> Dict:
+    def sync_all(self, batch_size: int = DEFAULT_BLOCK_ROWS, parallel_contracts: int = 4) -> Dict:
+        """
+        Sync every configured symbol concurrently.
+
+        Symbols write to different tables from different files, so each runs
+        on its own thread with its own connections (see sync_symbol).
+        """
+        symbols = self.config.get_all_symbols()
+        if not symbols:
+            return {}
+
         results = {}
-        for symbol in self.config.get_all_symbols():
-            results[symbol] = self.sync_symbol(symbol, batch_size=batch_size)
+        with ThreadPoolExecutor(max_workers=len(symbols)) as pool:
+            futures = {
+                pool.submit(self.sync_symbol, symbol, batch_size=batch_size,
+                            parallel_contracts=parallel_contracts): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
         return results
 
 
@@ -274,8 +492,11 @@ def main():
 
     parser = argparse.ArgumentParser(description="Sync SCID tick data to ClickHouse")
     parser.add_argument("--symbol", "-s", help="Symbol to sync (ES, NQ). If not specified, syncs all.")
-    parser.add_argument("--batch-size", "-b", type=int, default=100000, help="Batch size for inserts (default: 100000)")
+    parser.add_argument("--batch-size", "-b", type=int, default=DEFAULT_BLOCK_ROWS,
+                        help=f"Batch size for inserts; keep it a multiple of the native block size (default: {DEFAULT_BLOCK_ROWS})")
     parser.add_argument("--config", "-c", help="Path to config.json")
+    parser.add_argument("--parallel-contracts", "-p", type=int, default=4,
+                        help="Contract files to sync concurrently, one connection each (default: 4)")
 
     args = parser.parse_args()
 
@@ -283,9 +504,10 @@ def main():
     sync = ClickHouseSync(config=config)
 
     if args.symbol:
-        sync.sync_symbol(args.symbol, batch_size=args.batch_size)
+        sync.sync_symbol(args.symbol, batch_size=args.batch_size,
+                         parallel_contracts=args.parallel_contracts)
     else:
-        sync.sync_all(batch_size=args.batch_size)
+        sync.sync_all(batch_size=args.batch_size, parallel_contracts=args.parallel_contracts)
 
 
 if __name__ == "__main__":
@@ -4,13 +4,21 @@ Configuration module for SCID to PostgreSQL import.
 Loads and manages configuration from config.json.
 """
 
-import json
+import copy
+import datetime
+from functools import cached_property
 from pathlib import Path
 from dataclasses import dataclass
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+import json_compat
 
-@dataclass
+# Parsed config files by (absolute path, mtime); every Config loaded from
+# the same unchanged file gets its own copy of the parsed dict
+_LOADED: Dict[Tuple[str, int], Dict] = {}
+
+
+@dataclass(frozen=True)
 class DatabaseConfig:
     """PostgreSQL database configuration."""
     host: str
@@ -19,17 +27,37 @@ class DatabaseConfig:
     password: str
     database: str
 
+    @cached_property
+    def connection_string(self) -> str:
+        """asyncpg connection string, built once per (immutable) config."""
+        return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
+
     def get_connection_string(self) -> str:
         """Get asyncpg connection string."""
-        return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
+        return self.connection_string
+
+
+def parse_date(date_str: Optional[str]) -> Optional[datetime.datetime]:
+    """Parse a config date (YYYY-MM-DD) as midnight UTC; None stays None."""
+    if not date_str:
+        return None
+    # Same fast path as MultiContractParser._parse_date
+    if (len(date_str) == 10 and date_str[4] == date_str[7] == '-'
+            and (date_str[0:4] + date_str[5:7] + date_str[8:10]).isdigit()):
+        try:
+            return datetime.datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+                                     tzinfo=datetime.timezone.utc)
+        except ValueError:
+            pass
+    return datetime.datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc)
 
 
 @dataclass
 class ContractConfig:
-    """Configuration for a single contract file."""
+    """Configuration for a single contract file. Dates are parsed, UTC."""
     file: str
-    start_date: Optional[str]
-    end_date: Optional[str]
+    start_date: Optional[datetime.datetime]
+    end_date: Optional[datetime.datetime]
 
 
 @dataclass
@@ -84,18 +112,23 @@ class Config:
         self.load()
 
     def load(self) -> None:
-        """Load configuration from file."""
+        """Load configuration from file (parsed once per unchanged file)."""
         if self.config_path.exists():
-            with open(self.config_path, 'r') as f:
-                self._config = json.load(f)
+            key = (str(self.config_path.resolve()), self.config_path.stat().st_mtime_ns)
+            cached = _LOADED.get(key)
+            if cached is None:
+                with open(self.config_path, 'rb') as f:
+                    cached = _LOADED[key] = json_compat.loads(f.read())
+            # A copy, so add_contract() on one instance doesn't leak into others
+            self._config = copy.deepcopy(cached)
         else:
             print(f"Config file not found at {self.config_path}, using defaults.")
             self._config = self.DEFAULT_CONFIG.copy()
 
     def save(self) -> None:
         """Save current configuration to file."""
-        with open(self.config_path, 'w') as f:
-            json.dump(self._config, f, indent=4)
+        with open(self.config_path, 'wb') as f:
+            f.write(json_compat.dumps(self._config, indent=True))
 
     def create_default_config(self) -> None:
         """Create a default config.json file."""
@@ -135,8 +168,8 @@ class Config:
         for c in sym_config.get("contracts", []):
             contracts.append(ContractConfig(
                 file=c.get("file", ""),
-                start_date=c.get("start_date"),
-                end_date=c.get("end_date")
+                start_date=parse_date(c.get("start_date")),
+                end_date=parse_date(c.get("end_date"))
             ))
 
         return SymbolConfig(
@@ -1,177 +1,385 @@
 import asyncio
-import json
+import contextlib
+import os
+import sqlite3
 import time
-import concurrent.futures
 import threading
-import queue
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import datetime
-import multiprocessing
 
-from parser import SCIDParser, MultiContractParser, SCIDRecord
+from parser import SCIDParser, MultiContractParser, SCIDRecord, HEADER_SIZE, RECORD_SIZE, join_pgcopy
 from db_manager import DBManager, DBConfig
 from config import Config
+import json_compat
 
+# Connections (in-flight batches) per contract
+PIPELINE_DEPTH = 2
 
-def process_contract_worker(
-    db_config_data: dict,
+# Contract files read at once across all symbols (a typical NVMe queue depth);
+# also caps the pool at PIPELINE_DEPTH connections per reading contract
+MAX_CONCURRENT_READS = 32
+
+
+async def process_contract(
+    dbs: Sequence[DBManager],
     symbol: str,
     contract_file: str,
-    start_date_str: Optional[str],
-    end_date_str: Optional[str],
+    start_date: Optional[datetime.datetime],
+    end_date: Optional[datetime.datetime],
     batch_size: int,
-    table_name: str
+    table_name: str,
+    checkpoint: Optional["Checkpoint"] = None
 ) -> Dict:
     """
-    Worker function to process a single contract file in a separate process.
-    Uses pipeline parallelism: one thread parses while async loop inserts.
+    Import a single contract file over the connections in dbs.
+    Uses pipeline parallelism: an executor thread reads the file while this
+    coroutine COPYs; contracts run concurrently as tasks on one event loop.
+    Consecutive batches go to the connections in turn, so one batch's
+    INSERT ... SELECT runs on the server while the next is being COPYed.
+
+    With a checkpoint, the import resumes from the file offset saved for
+    this contract, and the offset is advanced as batches commit. On failure
+    stats["error"] holds the reason, and the contract is left unfinished.
     """
-    async def _async_work():
-        db_cfg = DBConfig(**db_config_data)
-        db = DBManager(db_cfg)
-        await db.connect()
+    stats = {
+        "contract": Path(contract_file).name,
+        "processed": 0,
+        "inserted": 0,
+        "elapsed": 0.0
+    }
+
+    try:
+        if not Path(contract_file).exists():
+            print(f"File not found: {contract_file}")
+            stats["error"] = "File not found"
+            return stats
 
-        stats = {
-            "contract": Path(contract_file).name,
-            "processed": 0,
-            "inserted": 0,
-            "elapsed": 0.0
-        }
+        start_time = time.time()
 
-        try:
-            if not Path(contract_file).exists():
-                print(f"File not found: {contract_file}")
-                return stats
+        print(f"Starting import: {Path(contract_file).name} -> {table_name} (pipelined)")
 
-            start_time = time.time()
+        # Encoded batches cross from the parser thread to this event loop
+        # through an asyncio.Queue, so the loop sleeps until a batch (or EOF)
+        # arrives instead of polling. Two batches buffered bounds memory.
+        loop = asyncio.get_running_loop()
+        batch_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        stop = threading.Event()
+
+        def handoff(item) -> None:
+            asyncio.run_coroutine_threadsafe(batch_queue.put(item), loop).result()
+
+        parser = SCIDParser(contract_file)
+        resume_offset = checkpoint.get_offset(symbol, contract_file) if checkpoint else 0
+        if resume_offset:
+            print(f"Resuming {Path(contract_file).name} at byte {resume_offset:,}")
+
+        # A datetime generated from raw_time on the server is not sent
+        columns = await dbs[0].insert_columns(table_name)
+        with_datetime = "datetime" in columns
+
+        def parse() -> None:
+            """Runs in an executor thread; reads the SCID file in batches."""
+            try:
+                count = 0
+                for arr in parser.read_record_arrays(batch_size, start_date=start_date,
+                                                     end_date=end_date, offset=resume_offset):
+                    if stop.is_set():
+                        break
+                    count += len(arr)
+                    # Encode to binary COPY here, off the event loop
+                    handoff((parser.to_pgcopy(arr, with_datetime), count, parser.position))
+            finally:
+                handoff(None)
+
+        parse_task = loop.run_in_executor(None, parse)
+
+        # Main async loop consumes batches and COPYs them in, one in-flight
+        # batch per connection
+        last_print = 0
+        drained = False
+        in_flight: List[Optional[asyncio.Task]] = [None] * len(dbs)
+        # File offset reached by the batch in each slot
+        offsets: List[int] = [0] * len(dbs)
+        slot = 0
+
+        async def commit(slot: int) -> None:
+            # Batches are awaited in submission order, so once this one has
+            # committed every earlier batch has too
+            stats["inserted"] += await in_flight[slot]
+            if checkpoint:
+                checkpoint.set_offset(symbol, contract_file, offsets[slot])
 
-            # Parse dates
-            s_date = datetime.datetime.strptime(start_date_str, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc) if start_date_str else None
-            e_date = datetime.datetime.strptime(end_date_str, "%Y-%m-%d").replace(tzinfo=datetime.timezone.utc) if end_date_str else None
+        try:
+            while True:
+                item = await batch_queue.get()
+                if item is None:
+                    drained = True
+                    break
+                payload, count, offset = item
 
-            print(f"Starting import: {Path(contract_file).name} -> {table_name} (pipelined)")
+                # Staging tables are per session, so a connection takes its
+                # next batch only once its previous one has committed
+                if in_flight[slot] is not None:
+                    await commit(slot)
 
-            # Queue for batches (max 3 batches buffered to limit memory)
-            batch_queue = queue.Queue(maxsize=3)
-            parse_done = threading.Event()
-            parse_error = [None]  # Use list to allow mutation in thread
+                # The batch goes over the wire as one binary COPY payload;
+                # no per-row tuples are built
+                in_flight[slot] = asyncio.create_task(
+                    dbs[slot].insert_binary(table_name, payload, columns)
+                )
+                offsets[slot] = offset
+                slot = (slot + 1) % len(dbs)
+                stats["processed"] = count
 
-            def parser_thread():
-                """Background thread that reads and parses SCID file into batches."""
-                try:
-                    parser = SCIDParser(contract_file)
-                    batch = []
-                    count = 0
+                if stats["processed"] - last_print >= 100000:
+                    print(f"[{symbol}] {Path(contract_file).name}: {stats['processed']:,} rows processed")
+                    last_print = stats["processed"]
 
-                    for record in parser.read_records(start_date=s_date, end_date=e_date, buffer_size=256*1024):
-                        batch.append(record.to_db_tuple())
-                        count += 1
+            # Drain in submission order, starting with the oldest batch
+            for i in range(len(dbs)):
+                oldest = (slot + i) % len(dbs)
+                if in_flight[oldest] is not None:
+                    await commit(oldest)
+        finally:
+            for task in in_flight:
+                if task is not None and not task.done():
+                    task.cancel()
+            await asyncio.gather(*[task for task in in_flight if task is not None], return_exceptions=True)
+            if not drained:
+                # Insert failed mid-stream: stop the parser and unblock its handoff
+                stop.set()
+                while await batch_queue.get() is not None:
+                    pass
 
-                        if len(batch) >= batch_size:
-                            batch_queue.put((batch, count))
-                            batch = []
+        # Re-raises any parse error
+        await parse_task
 
-                    # Put remaining batch
-                    if batch:
-                        batch_queue.put((batch, count))
+        stats["elapsed"] = time.time() - start_time
+        print(f"Completed {Path(contract_file).name}: {stats['inserted']:,} inserted in {stats['elapsed']:.2f}s")
 
-                except Exception as e:
-                    parse_error[0] = e
-                finally:
-                    parse_done.set()
+    except Exception as e:
+        print(f"Error processing {contract_file}: {e}")
+        stats["error"] = str(e)
 
-            # Start parser thread
-            parser_t = threading.Thread(target=parser_thread, daemon=True)
-            parser_t.start()
+    return stats
 
-            # Main async loop consumes batches and inserts
-            last_print = 0
 
-            while True:
-                # Check if parsing is done and queue is empty
-                if parse_done.is_set() and batch_queue.empty():
-                    break
+async def process_contract_parallel_copy(
+    db: DBManager,
+    symbol: str,
+    contract_file: str,
+    start_date: Optional[datetime.datetime],
+    end_date: Optional[datetime.datetime],
+    batch_size: int,
+    table_name: str,
+    workers: int,
+    checkpoint: Optional["Checkpoint"] = None
+) -> Dict:
+    """
+    Import a single contract file through timescaledb-parallel-copy.
+    An executor thread encodes the file as CSV, which is streamed into the
+    tool's stdin; the tool spreads the rows over `workers` connections.
+    Rows go straight into the table, so this is for bulk mode only.
+
+    The tool commits batches out of order, so the checkpoint offset is only
+    advanced once the whole file is in. On failure stats["error"] holds the
+    reason.
+    """
+    stats = {
+        "contract": Path(contract_file).name,
+        "processed": 0,
+        "inserted": 0,
+        "elapsed": 0.0
+    }
+
+    try:
+        if not Path(contract_file).exists():
+            print(f"File not found: {contract_file}")
+            stats["error"] = "File not found"
+            return stats
 
-                try:
-                    # Get batch with timeout to allow checking parse_done
-                    batch, count = batch_queue.get(timeout=0.1)
-                except queue.Empty:
-                    continue
+        start_time = time.time()
 
+        print(f"Starting import: {Path(contract_file).name} -> {table_name} "
+              f"(timescaledb-parallel-copy, {workers} workers)")
+
+        loop = asyncio.get_running_loop()
+        batch_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        stop = threading.Event()
+
+        def handoff(item) -> None:
+            asyncio.run_coroutine_threadsafe(batch_queue.put(item), loop).result()
+
+        parser = SCIDParser(contract_file)
+        resume_offset = checkpoint.get_offset(symbol, contract_file) if checkpoint else 0
+        if resume_offset:
+            print(f"Resuming {Path(contract_file).name} at byte {resume_offset:,}")
+
+        columns = await db.insert_columns(table_name)
+        with_datetime = "datetime" in columns
+
+        def parse() -> None:
+            """Runs in an executor thread; reads the SCID file in batches."""
+            try:
+                count = 0
+                for arr in parser.read_record_arrays(batch_size, start_date=start_date,
+                                                     end_date=end_date, offset=resume_offset):
+                    if stop.is_set():
+                        break
+                    count += len(arr)
+                    handoff((parser.to_csv(arr, with_datetime), count, parser.position))
+            finally:
+                handoff(None)
+
+        parse_task = loop.run_in_executor(None, parse)
+
+        state = {"drained": False, "offset": 0}
+
+        async def chunks():
+            last_print = 0
+            while True:
+                item = await batch_queue.get()
+                if item is None:
+                    state["drained"] = True
+                    return
+                payload, count, state["offset"] = item
+                yield payload
                 stats["processed"] = count
-                inserted = await db.insert_records(table_name, batch)
-                stats["inserted"] += inserted
 
                 if stats["processed"] - last_print >= 100000:
                     print(f"[{symbol}] {Path(contract_file).name}: {stats['processed']:,} rows processed")
                     last_print = stats["processed"]
 
-            # Wait for parser thread to finish
-            parser_t.join()
-
-            if parse_error[0]:
-                raise parse_error[0]
+        try:
+            stats["inserted"] = await db.bulk_copy_parallel(
+                table_name, chunks(), columns, workers=workers
+            )
+        finally:
+            if not state["drained"]:
+                # Copy failed mid-stream: stop the parser and unblock its handoff
+                stop.set()
+                while await batch_queue.get() is not None:
+                    pass
 
-            stats["elapsed"] = time.time() - start_time
-            print(f"Completed {Path(contract_file).name}: {stats['inserted']:,} inserted in {stats['elapsed']:.2f}s")
+        # Re-raises any parse error
+        await parse_task
+        if checkpoint and state["offset"]:
+            checkpoint.set_offset(symbol, contract_file, state["offset"])
 
-        except Exception as e:
-            print(f"Error processing {contract_file}: {e}")
-        finally:
-            await db.close()
+        stats["elapsed"] = time.time() - start_time
+        print(f"Completed {Path(contract_file).name}: {stats['inserted']:,} inserted in {stats['elapsed']:.2f}s")
 
-        return stats
+    except Exception as e:
+        print(f"Error processing {contract_file}: {e}")
+        stats["error"] = str(e)
 
-    # Run the async worker in this process
-    return asyncio.run(_async_work())
+    return stats
 
 
 class Checkpoint:
     """
     Manages checkpoint state for incremental imports.
-    Tracks last position per file to support resumable imports.
+    Tracks, per file, whether it is completed and how far into it the
+    import has committed, so an interrupted file resumes mid-way.
+
+    State lives in a SQLite database in WAL mode; every update is a single
+    autocommitted row upsert, so there is nothing to save() or compact.
     """
 
     def __init__(self, checkpoint_path: str = None):
         if checkpoint_path is None:
-            checkpoint_path = Path(__file__).parent / "checkpoint.json"
+            checkpoint_path = Path(__file__).parent / "checkpoint.db"
 
         self.path = Path(checkpoint_path)
-        self._data: Dict = {}
-        self.load()
-
-    def load(self) -> None:
-        if self.path.exists():
-            with open(self.path, 'r') as f:
-                self._data = json.load(f)
-        else:
-            self._data = {}
+        self._name_cache: Dict[str, str] = {}
+        self._conn = sqlite3.connect(self.path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Commits survive a process crash; only an OS crash can lose the last few
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS ckpt (
+                symbol TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                offset INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (symbol, filename)
+            )
+        """)
+        self._import_json(self.path.with_suffix(".json"))
+
+    def _import_json(self, json_path: Path) -> None:
+        """One-off import of the old checkpoint.json (plus its .log) into an empty database."""
+        if not json_path.exists() or self._conn.execute("SELECT 1 FROM ckpt LIMIT 1").fetchone():
+            return
+
+        with open(json_path, 'rb') as f:
+            data = json_compat.loads(f.read())
+        rows = {
+            (symbol, filename): state.get("completed", False)
+            for symbol, sym_data in data.items()
+            for filename, state in sym_data.get("files", {}).items()
+        }
 
-    def save(self) -> None:
-        with open(self.path, 'w') as f:
-            json.dump(self._data, f, indent=4)
+        log_path = json_path.with_name(json_path.name + ".log")
+        if log_path.exists():
+            with open(log_path, 'rb') as f:
+                for line in f:
+                    try:
+                        entry = json_compat.loads(line)
+                    except json_compat.JSONDecodeError:
+                        break  # Torn last line from an interrupted write
+                    rows[(entry["sym"], entry["file"])] = entry["done"]
+
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ckpt (symbol, filename, completed) VALUES (?, ?, ?)",
+                [(symbol, filename, int(done)) for (symbol, filename), done in rows.items()]
+            )
+        print(f"Imported {len(rows)} checkpoint entries from {json_path.name}")
+
+    def close(self) -> None:
+        """Close the database (folds the WAL back into the main file)."""
+        self._conn.close()
+
+    def _filename(self, file_path: str) -> str:
+        """Checkpoint key for a file (its basename), cached per path."""
+        filename = self._name_cache.get(file_path)
+        if filename is None:
+            filename = self._name_cache[file_path] = os.path.basename(file_path)
+        return filename
 
     def set_completed(self, symbol: str, file_path: str, completed: bool = True) -> None:
-        filename = Path(file_path).name
-        if symbol not in self._data:
-            self._data[symbol] = {"files": {}}
-        if "files" not in self._data[symbol]:
-            self._data[symbol]["files"] = {}
-        if filename not in self._data[symbol]["files"]:
-            self._data[symbol]["files"][filename] = {}
-        self._data[symbol]["files"][filename]["completed"] = completed
+        self._conn.execute(
+            """INSERT INTO ckpt (symbol, filename, completed) VALUES (?, ?, ?)
+               ON CONFLICT (symbol, filename) DO UPDATE SET completed = excluded.completed""",
+            (symbol, self._filename(file_path), int(completed))
+        )
+
+    def set_offset(self, symbol: str, file_path: str, byte_offset: int) -> None:
+        """Record that everything before byte_offset in the file has been imported."""
+        self._conn.execute(
+            """INSERT INTO ckpt (symbol, filename, offset) VALUES (?, ?, ?)
+               ON CONFLICT (symbol, filename) DO UPDATE SET offset = excluded.offset""",
+            (symbol, self._filename(file_path), byte_offset)
+        )
+
+    def get_offset(self, symbol: str, file_path: str) -> int:
+        """Byte offset to resume the file from (0 if never started)."""
+        row = self._conn.execute(
+            "SELECT offset FROM ckpt WHERE symbol = ? AND filename = ?",
+            (symbol, self._filename(file_path))
+        ).fetchone()
+        return row[0] if row else 0
 
     def is_completed(self, symbol: str, file_path: str) -> bool:
         """Check if a file has already been completed for a symbol."""
-        filename = Path(file_path).name
-        if symbol not in self._data:
-            return False
-        if "files" not in self._data[symbol]:
-            return False
-        if filename not in self._data[symbol]["files"]:
-            return False
-        return self._data[symbol]["files"][filename].get("completed", False)
+        row = self._conn.execute(
+            "SELECT completed FROM ckpt WHERE symbol = ? AND filename = ?",
+            (symbol, self._filename(file_path))
+        ).fetchone()
+        return bool(row and row[0])
 
 
 class DataSync:
@@ -180,9 +388,190 @@ class DataSync:
     Reads from configured SCID files and inserts into ES/NQ tables.
     """
 
-    def __init__(self, config: Config = None, checkpoint: Checkpoint = None):
+    def __init__(self, config: Config = None, checkpoint: Checkpoint = None, bulk_mode: bool = False,
+                 parallel_copy: int = 0):
+        """
+        Args:
+            config: Symbol and database configuration
+            checkpoint: Import progress store
+            bulk_mode: Load each table UNLOGGED with its indexes dropped,
+                COPYing straight into it; de-duplicate, rebuild the indexes
+                and switch it back to LOGGED at the end (initial loads only:
+                needs exclusive access)
+            parallel_copy: With bulk_mode, load through
+                timescaledb-parallel-copy with this many workers, one
+                contract at a time; 0 uses the built-in binary COPY
+        """
         self.config = config or Config()
         self.checkpoint = checkpoint or Checkpoint()
+        self.bulk_mode = bulk_mode
+        self.parallel_copy = parallel_copy if bulk_mode else 0
+
+        # One pool shared by every contract of every symbol; created on first sync
+        self._acquire_lock = asyncio.Lock()
+        # timescaledb-parallel-copy opens its own connections per contract,
+        # so contracts go through it one at a time
+        self._read_slots = asyncio.Semaphore(1 if self.parallel_copy else MAX_CONCURRENT_READS)
+        db = self.config.database
+        self.db = DBManager(DBConfig(
+            host=db.host,
+            port=db.port,
+            user=db.user,
+            password=db.password,
+            database=db.database,
+            maintenance_work_mem="2GB" if bulk_mode else None,
+            direct_copy=bulk_mode
+        ))
+
+    async def close(self) -> None:
+        """Close the shared connection pool and the checkpoint database."""
+        await self.db.close()
+        self.checkpoint.close()
+
+    async def _ensure_pool(self, n_contracts: int) -> None:
+        """Create the shared pool, sized for n_contracts importing at once."""
+        if self.db.pool is None:
+            max_size = max(5, PIPELINE_DEPTH * min(n_contracts, MAX_CONCURRENT_READS))
+            await self.db.create_pool(min_size=5, max_size=max_size)
+
+    def _pending_contracts(self, symbol: str, sym_config) -> List:
+        """Contracts of a symbol not yet completed according to the checkpoint."""
+        pending = []
+        for contract_cfg in sym_config.contracts:
+            # Check checkpoint
+            if self.checkpoint.is_completed(symbol, contract_cfg.file):
+                print(f"Skipping {Path(contract_cfg.file).name} (already completed)")
+                continue
+            pending.append(contract_cfg)
+        return pending
+
+    async def _sync_contract(self, symbol: str, contract_cfg, batch_size: int, table_name: str) -> Dict:
+        """Import one contract on PIPELINE_DEPTH pooled connections, or via timescaledb-parallel-copy."""
+        if self.parallel_copy:
+            async with self._read_slots, self.db.acquire() as db:
+                stats = await process_contract_parallel_copy(
+                    db,
+                    symbol,
+                    contract_cfg.file,
+                    contract_cfg.start_date,
+                    contract_cfg.end_date,
+                    batch_size,
+                    table_name,
+                    self.parallel_copy,
+                    checkpoint=self.checkpoint
+                )
+            if "error" not in stats:
+                self.checkpoint.set_completed(symbol, contract_cfg.file, True)
+            return stats
+
+        async with self._read_slots, contextlib.AsyncExitStack() as stack:
+            # Take the connections as a group so two contracts can never each
+            # hold part of a set and wait on the other
+            async with self._acquire_lock:
+                dbs = [await stack.enter_async_context(self.db.acquire())
+                       for _ in range(PIPELINE_DEPTH)]
+            stats = await process_contract(
+                dbs,
+                symbol,
+                contract_cfg.file,
+                contract_cfg.start_date,
+                contract_cfg.end_date,
+                batch_size,
+                table_name,
+                checkpoint=self.checkpoint
+            )
+        # A failed contract stays pending and resumes from its saved offset
+        if "error" not in stats:
+            self.checkpoint.set_completed(symbol, contract_cfg.file, True)
+        return stats
+
+    def _split_small(self, symbol: str, contracts: List, batch_size: int) -> Tuple[List, List[List]]:
+        """
+        Separate contracts with less than a batch left to import.
+
+        The small ones are grouped so each group holds at most batch_size
+        rows; returns (other contracts, groups). Rows left are estimated from
+        the file size and the checkpoint offset, ignoring the date range, so
+        the estimate is an upper bound.
+        """
+        large, groups = [], []
+        group, group_rows = [], 0
+        for contract_cfg in contracts:
+            try:
+                size = os.path.getsize(contract_cfg.file)
+            except OSError:
+                # Reported as missing by process_contract
+                large.append(contract_cfg)
+                continue
+            offset = max(self.checkpoint.get_offset(symbol, contract_cfg.file), HEADER_SIZE)
+            rows = max(size - offset, 0) // RECORD_SIZE
+            if rows >= batch_size:
+                large.append(contract_cfg)
+                continue
+            if group and group_rows + rows > batch_size:
+                groups.append(group)
+                group, group_rows = [], 0
+            group.append(contract_cfg)
+            group_rows += rows
+        if group:
+            groups.append(group)
+        return large, groups
+
+    async def _sync_contract_group(self, symbol: str, contracts: List, batch_size: int, table_name: str) -> Dict:
+        """
+        Import several small contracts as one batch.
+
+        Their rows are read and encoded in an executor thread, then sent as
+        one binary COPY and one INSERT ... SELECT instead of one of each per
+        contract. The contract column is set per row, so batches can mix
+        contracts freely.
+        """
+        names = ", ".join(Path(c.file).name for c in contracts)
+        stats = {
+            "contract": names,
+            "processed": 0,
+            "inserted": 0,
+            "elapsed": 0.0
+        }
+        # The checkpoint's SQLite connection belongs to this thread
+        offsets = [self.checkpoint.get_offset(symbol, c.file) for c in contracts]
+        ends = list(offsets)
+
+        try:
+            async with self._read_slots, self.db.acquire() as db:
+                start_time = time.time()
+                print(f"Starting import: {names} -> {table_name} (merged)")
+
+                columns = await db.insert_columns(table_name)
+                with_datetime = "datetime" in columns
+
+                def parse():
+                    """Runs in an executor thread; reads every contract of the group."""
+                    payloads = []
+                    for i, contract_cfg in enumerate(contracts):
+                        parser = SCIDParser(contract_cfg.file)
+                        for arr in parser.read_record_arrays(batch_size, start_date=contract_cfg.start_date,
+                                                             end_date=contract_cfg.end_date, offset=offsets[i]):
+                            payloads.append(parser.to_pgcopy(arr, with_datetime))
+                            stats["processed"] += len(arr)
+                        ends[i] = max(parser.position, offsets[i])
+                    return join_pgcopy(payloads)
+
+                payload = await asyncio.get_running_loop().run_in_executor(None, parse)
+                if stats["processed"]:
+                    stats["inserted"] = await db.insert_binary(table_name, payload, columns)
+
+                for contract_cfg, end in zip(contracts, ends):
+                    self.checkpoint.set_offset(symbol, contract_cfg.file, end)
+                    # Only once the rows are in, so a failed group is retried
+                    self.checkpoint.set_completed(symbol, contract_cfg.file, True)
+                stats["elapsed"] = time.time() - start_time
+                print(f"Completed {names}: {stats['inserted']:,} inserted in {stats['elapsed']:.2f}s")
+        except Exception as e:
+            print(f"Error processing {names}: {e}")
+            stats["error"] = str(e)
+
+        return stats
 
     async def sync_symbol(
         self,
@@ -192,6 +581,10 @@ class DataSync:
     ) -> Dict:
         """
         Sync all contracts for a symbol in PARALLEL.
+
+        Contracts run as concurrent tasks in this event loop, each on its own
+        pooled connection; the server's COPY/INSERT throughput is the limit,
+        not Python.
         """
         sym_config = self.config.get_symbol_config(symbol)
         if not sym_config:
@@ -206,55 +599,47 @@ class DataSync:
 
         start_time = time.time()
 
-        # Prepare arguments for workers
-        tasks = []
-        db_config_dict = {
-            "host": self.config.database.host,
-            "port": self.config.database.port,
-            "user": self.config.database.user,
-            "password": self.config.database.password,
-            "database": self.config.database.database
-        }
+        pending = self._pending_contracts(symbol, sym_config)
+        await self._ensure_pool(len(pending))
 
-        loop = asyncio.get_running_loop()
-        # Limit workers to CPU count to avoid thrashing
-        max_workers = min(multiprocessing.cpu_count(), len(sym_config.contracts))
-
-        with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
-            futures = []
-            for contract_cfg in sym_config.contracts:
-                file_path = contract_cfg.file
-
-                # Check checkpoint
-                if self.checkpoint.is_completed(symbol, file_path):
-                    print(f"Skipping {Path(file_path).name} (already completed)")
-                    continue
-
-                # Create a task for each file
-                future = loop.run_in_executor(
-                    executor,
-                    process_contract_worker,
-                    db_config_dict,
-                    symbol,
-                    file_path,
-                    contract_cfg.start_date,
-                    contract_cfg.end_date,
-                    batch_size,
-                    table_name
-                )
-                futures.append(future)
+        unlogged = False
+        indexes = []
+        removed = 0
+        if self.bulk_mode and pending:
+            async with self.db.acquire() as db:
+                unlogged = await db.set_unlogged(table_name)
+                print(f"Dropping indexes on {table_name} for the bulk load...")
+                indexes = await db.drop_indexes(table_name)
+
+        # Contracts with only a tail left share batches instead of
+        # paying for a COPY and an INSERT ... SELECT each
+        large, groups = self._split_small(symbol, pending, batch_size)
 
-            # Wait for all files to complete
-            results = await asyncio.gather(*futures)
+        try:
+            # Pool size bounds how many contracts COPY at once; the rest wait in acquire()
+            results = await asyncio.gather(*[
+                self._sync_contract(symbol, contract_cfg, batch_size, table_name)
+                for contract_cfg in large
+            ], *[
+                self._sync_contract_group(symbol, group, batch_size, table_name)
+                for group in groups
+            ])
+        finally:
+            if self.bulk_mode and pending:
+                async with self.db.acquire() as db:
+                    # Batches went in without ON CONFLICT; drop repeats
+                    # before the unique index comes back
+                    removed = await db.delete_duplicates(table_name)
+                    print(f"Removed {removed:,} duplicate rows from {table_name}")
+                    await db.rebuild_indexes(table_name, indexes)
+                    if unlogged:
+                        print(f"Switching {table_name} back to LOGGED...")
+                        await db.set_logged(table_name)
 
         # Aggregating results
         total_processed = sum(r['processed'] for r in results)
-        total_inserted = sum(r['inserted'] for r in results)
-
-        # Update checkpoints
-        for contract_cfg in sym_config.contracts:
-            self.checkpoint.set_completed(symbol, contract_cfg.file, True)
-        self.checkpoint.save()
+        total_inserted = sum(r['inserted'] for r in results) - removed
+        failed = [r['contract'] for r in results if 'error' in r]
 
         elapsed = time.time() - start_time
 
@@ -264,7 +649,8 @@ class DataSync:
             "processed": total_processed,
             "inserted": total_inserted,
             "elapsed_seconds": elapsed,
-            "records_per_second": total_processed / elapsed if elapsed > 0 else 0
+            "records_per_second": total_processed / elapsed if elapsed > 0 else 0,
+            "failed": failed
         }
 
         print(f"\n{'='*60}")
@@ -273,15 +659,33 @@ class DataSync:
         print(f"  Total Inserted:  {total_inserted:,}")
         print(f"  Time Elapsed:    {elapsed:.2f} seconds")
         print(f"  Rate:            {stats['records_per_second']:,.0f} records/sec (Aggregate)")
+        if failed:
+            print(f"  Failed (resumed on the next run): {', '.join(failed)}")
         print(f"{'='*60}")
 
         return stats
 
     async def sync_all(self, batch_size: int = 100000) -> Dict:
-        results = {}
-        for symbol in self.config.get_all_symbols():
-            results[symbol] = await self.sync_symbol(symbol, batch_size=batch_size)
-        return results
+        """
+        Sync every configured symbol concurrently.
+
+        Symbols write to separate tables, so they share the pool and run side
+        by side; MAX_CONCURRENT_READS bounds the contracts reading at once.
+        """
+        symbols = self.config.get_all_symbols()
+
+        # Size the shared pool for all symbols before any of them creates it
+        n_pending = 0
+        for symbol in symbols:
+            sym_config = self.config.get_symbol_config(symbol)
+            if sym_config:
+                n_pending += sum(not self.checkpoint.is_completed(symbol, c.file) for c in sym_config.contracts)
+        await self._ensure_pool(n_pending)
+
+        results = await asyncio.gather(*[
+            self.sync_symbol(symbol, batch_size=batch_size) for symbol in symbols
+        ])
+        return dict(zip(symbols, results))
 
 
 async def main():
@@ -292,16 +696,28 @@ async def main():
     parser.add_argument("--symbol", "-s", help="Symbol to sync (ES, NQ). If not specified, syncs all.")
     parser.add_argument("--batch-size", "-b", type=int, default=100000, help="Batch size for inserts (default: 100000)")
     parser.add_argument("--config", "-c", help="Path to config.json")
+    parser.add_argument("--bulk-mode", action="store_true",
+                        help="Load into UNLOGGED tables (not hypertables) with indexes dropped, "
+                             "then de-duplicate, rebuild indexes and set LOGGED "
+                             "(initial loads only; needs exclusive access)")
+    parser.add_argument("--parallel-copy", type=int, default=0, metavar="WORKERS",
+                        help="With --bulk-mode, load through timescaledb-parallel-copy "
+                             "with this many workers (must be on PATH)")
 
     args = parser.parse_args()
+    if args.parallel_copy and not args.bulk_mode:
+        parser.error("--parallel-copy requires --bulk-mode")
 
     config = Config(args.config) if args.config else Config()
-    sync = DataSync(config=config)
+    sync = DataSync(config=config, bulk_mode=args.bulk_mode, parallel_copy=args.parallel_copy)
 
-    if args.symbol:
-        await sync.sync_symbol(args.symbol, batch_size=args.batch_size)
-    else:
-        await sync.sync_all(batch_size=args.batch_size)
+    try:
+        if args.symbol:
+            await sync.sync_symbol(args.symbol, batch_size=args.batch_size)
+        else:
+            await sync.sync_all(batch_size=args.batch_size)
+    finally:
+        await sync.close()
 
 
 if __name__ == "__main__":
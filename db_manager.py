@@ -5,11 +5,18 @@ Handles async PostgreSQL connections and batch inserts for ES and NQ tables.
 """
 
 import asyncio
+import contextlib
+import os
+import re
+import shutil
 import asyncpg
-from typing import List, Optional, Tuple
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
 from dataclasses import dataclass
 import datetime
 
+# TimescaleDB's multi-worker COPY client (optional; see bulk_copy_parallel)
+PARALLEL_COPY_BIN = "timescaledb-parallel-copy"
+
 
 @dataclass
 class DBConfig:
@@ -19,6 +26,18 @@ class DBConfig:
     user: str = "postgres"
     password: str = "postgres"
     database: str = "future_index"
+    # Session synchronous_commit for import connections. "off" lets each batch
+    # commit without waiting for its WAL flush; a server crash can then lose
+    # the last few hundred ms of commits, which a re-run of the contract
+    # restores. None keeps the server default.
+    synchronous_commit: Optional[str] = "off"
+    # Session maintenance_work_mem (e.g. "2GB" for bulk loads, where it speeds
+    # up index rebuilds); None keeps the server default
+    maintenance_work_mem: Optional[str] = None
+    # COPY batches straight into the target table, without the staging table
+    # and ON CONFLICT. Only for bulk loads with the table's indexes dropped
+    # (drop_indexes); duplicates are removed afterwards by delete_duplicates()
+    direct_copy: bool = False
 
 
 class DBManager:
@@ -34,16 +53,21 @@ class DBManager:
         "num_trades", "volume", "bid_volume", "ask_volume", "contract"
     ]
 
-    def __init__(self, config: DBConfig = None):
+    def __init__(self, config: DBConfig = None, conn: Optional[asyncpg.Connection] = None):
         """
         Initialize database manager.
 
         Args:
             config: Database configuration. Uses defaults if not provided.
+            conn: Existing connection to use (e.g. one borrowed from a pool)
         """
         self.config = config or DBConfig()
         self.pool: Optional[asyncpg.Pool] = None
-        self._conn: Optional[asyncpg.Connection] = None
+        self._conn: Optional[asyncpg.Connection] = conn
+        # Target table -> staging temp table on self._conn
+        self._staging: Dict[str, str] = {}
+        # Target table -> COLUMNS it accepts on insert (generated ones left out)
+        self._insert_columns: Dict[str, List[str]] = {}
 
     async def connect(self) -> asyncpg.Connection:
         """
@@ -52,20 +76,27 @@ class DBManager:
         Returns:
             asyncpg Connection object
         """
+        self._staging = {}
         self._conn = await asyncpg.connect(
             host=self.config.host,
             port=self.config.port,
             user=self.config.user,
             password=self.config.password,
-            database=self.config.database
+            database=self.config.database,
+            server_settings=self._server_settings()
         )
+        await self._prepare_session(self._conn)
+        return self._conn
+
+    @staticmethod
+    async def _prepare_session(conn: asyncpg.Connection) -> None:
+        """Per-session settings; pooled connections get them on every acquire."""
         # Allow unlimited decompression for inserts into compressed chunks
         try:
-            await self._conn.execute("SET timescaledb.max_tuples_decompressed_per_dml_transaction = 0;")
+            await conn.execute("SET timescaledb.max_tuples_decompressed_per_dml_transaction = 0;")
         except Exception:
             # Ignore if parameter doesn't exist (e.g. standard Postgres)
             pass
-        return self._conn
 
     async def create_pool(self, min_size: int = 5, max_size: int = 20) -> asyncpg.Pool:
         """
@@ -85,123 +116,507 @@ class DBManager:
             password=self.config.password,
             database=self.config.database,
             min_size=min_size,
-            max_size=max_size
+            max_size=max_size,
+            server_settings=self._server_settings(),
+            # The pool's RESET ALL on release undoes SET, so reapply per acquire
+            setup=self._prepare_session
         )
         return self.pool
 
+    @contextlib.asynccontextmanager
+    async def acquire(self) -> AsyncIterator["DBManager"]:
+        """
+        Borrow a pooled connection as a DBManager bound to it.
+
+        The borrowed manager has its own staging-table cache and must not be
+        closed; the connection goes back to the pool on exit.
+        """
+        async with self.pool.acquire() as conn:
+            yield DBManager(self.config, conn=conn)
+
+    def _server_settings(self) -> Dict[str, str]:
+        """Session settings applied to every connection at startup."""
+        settings = {}
+        if self.config.synchronous_commit:
+            settings["synchronous_commit"] = self.config.synchronous_commit
+        if self.config.maintenance_work_mem:
+            settings["maintenance_work_mem"] = self.config.maintenance_work_mem
+        return settings
+
     async def close(self) -> None:
         """Close database connection and pool."""
         if self._conn:
             await self._conn.close()
             self._conn = None
+            self._staging = {}
         if self.pool:
             await self.pool.close()
             self.pool = None
 
+    async def copy_records(
+        self,
+        table_name: str,
+        columns: List[str],
+        records: Union[Iterable[Tuple], AsyncIterable[Tuple]],
+        schema_name: Optional[str] = "public"
+    ) -> int:
+        """
+        Bulk load records straight into a table with the binary COPY protocol.
+
+        No conflict handling: duplicate keys fail the whole COPY. Use
+        insert_records() when rows may already exist.
+
+        Args:
+            table_name: Target table
+            columns: Column names, in the order of each record tuple
+            records: Tuples in COPY column order (list or sync/async iterable)
+            schema_name: Schema of the table; None for temporary tables
+
+        Returns:
+            Number of records copied
+        """
+        if isinstance(records, (list, tuple)) and not records:
+            return 0
+
+        conn = self._conn or await self.connect()
+        result = await conn.copy_records_to_table(
+            table_name,
+            records=records,
+            columns=columns,
+            schema_name=schema_name
+        )
+        # Command tag is "COPY <n>"
+        return int(result.split()[-1]) if result else 0
+
     async def insert_records(
         self,
         table_name: str,
-        records: List[Tuple],
+        records: Union[Iterable[Tuple], AsyncIterable[Tuple]],
         batch_size: int = 10000
     ) -> int:
         """
         Insert tick records into the specified table using COPY for high performance.
 
-        Uses a temporary staging table to handle ON CONFLICT DO NOTHING requirements
-        while leveraging the speed of the COPY protocol.
+        Records are COPYed into a per-connection staging table and moved into
+        table_name with INSERT ... ON CONFLICT DO NOTHING, all in one
+        transaction. The staging table is created once per connection with
+        ON COMMIT DELETE ROWS, so it is empty again after every batch without
+        any per-batch DDL.
 
         Args:
             table_name: Table name (ES or NQ)
-            records: List of tuples from SCIDRecord.to_db_tuple()
+            records: Tuples from SCIDRecord.to_db_tuple() (COLUMNS order), as a
+                list or any sync/async iterable; iterables are streamed into
+                COPY without being materialised here
             batch_size: Not used in COPY mode but kept for compatibility
 
         Returns:
-            Number of records inserted (approximate, as ON CONFLICT ignores duplicates)
+            Number of records inserted (duplicates are skipped by ON CONFLICT)
         """
-        if not records:
+        if isinstance(records, (list, tuple)) and not records:
             return 0
 
-        conn = self._conn or await self.connect()
-
-        # Create a unique temp table name
-        temp_table = f"temp_{table_name.lower()}_{id(records)}"
-
-        # Columns string for the query
-        columns_str = ", ".join(self.COLUMNS)
-
         try:
-            # 1. Create temporary staging table
-            # We use LIKE to copy structure, but make it UNLOGGED for speed
-            await conn.execute(f"""
-                CREATE TEMP TABLE IF NOT EXISTS "{temp_table}"
-                (LIKE "{table_name}" INCLUDING DEFAULTS)
-            """)
-
-            # 2. Bulk load data into staging table using COPY
-            # This is significantly faster than INSERT
-            await conn.copy_records_to_table(
-                temp_table,
-                records=records,
-                columns=self.COLUMNS
+            return await self._merge_via_staging(
+                table_name,
+                lambda table, schema: self.copy_records(table, self.COLUMNS, records, schema_name=schema)
             )
+        except Exception as e:
+            if not isinstance(records, list):
+                raise
+            print(f"Error during bulk insert: {e}")
+            # Isolate the bad rows (e.g. a type mismatch) by splitting the
+            # batch and COPYing each half again, instead of row-by-row INSERTs
+            return await self._split_insert(table_name, records)
 
-            # 3. Move from staging to actual table with conflict handling
-            # This preserves the idempotency required for resuming imports
-            query = f"""
-                INSERT INTO "{table_name}" ({columns_str})
-                SELECT {columns_str}
-                FROM "{temp_table}"
-                ON CONFLICT (datetime, raw_time) DO NOTHING
-            """
+    async def insert_binary(
+        self,
+        table_name: str,
+        payload: bytes,
+        columns: Optional[List[str]] = None
+    ) -> int:
+        """
+        Insert a pre-encoded binary COPY payload into the specified table.
 
-            result = await conn.execute(query)
+        Same staging and ON CONFLICT handling as insert_records(), but the
+        rows arrive already in wire format (SCIDParser.to_pgcopy(), COLUMNS
+        order), so no Python objects are built per row.
 
-            # Extract number of inserted rows from command tag (e.g., "INSERT 0 100")
-            inserted_count = 0
-            if result:
-                parts = result.split()
-                if len(parts) > 2:
-                    inserted_count = int(parts[-1])
+        Args:
+            table_name: Table name (ES or NQ)
+            payload: Complete binary COPY stream, header and trailer included
+            columns: Columns encoded in payload; defaults to COLUMNS. Use
+                insert_columns() for tables with a generated datetime
 
-            return inserted_count
+        Returns:
+            Number of records inserted (duplicates are skipped by ON CONFLICT)
+        """
+        return await self._merge_via_staging(
+            table_name,
+            lambda table, schema: self.copy_binary(table, columns or self.COLUMNS, payload,
+                                                   schema_name=schema)
+        )
 
-        except Exception as e:
-            print(f"Error during bulk insert: {e}")
-            # Fallback to slow insert if COPY fails (e.g., type mismatch)
-            # This ensures robustness
-            return await self._fallback_insert(conn, table_name, records)
-        finally:
-            # Clean up temp table
-            try:
-                await conn.execute(f'DROP TABLE IF EXISTS "{temp_table}"')
-            except:
-                pass
+    async def copy_binary(
+        self,
+        table_name: str,
+        columns: List[str],
+        payload: bytes,
+        schema_name: Optional[str] = "public"
+    ) -> int:
+        """
+        Send an already-encoded binary COPY payload straight into a table.
 
-    async def _fallback_insert(
+        Args:
+            table_name: Target table
+            columns: Column names, in the payload's field order
+            payload: Binary COPY stream (any buffer-protocol object)
+            schema_name: Schema of the table; None for temporary tables
+
+        Returns:
+            Number of records copied
+        """
+        conn = self._conn or await self.connect()
+        result = await conn.copy_to_table(
+            table_name,
+            source=payload,
+            columns=columns,
+            schema_name=schema_name,
+            format="binary"
+        )
+        # Command tag is "COPY <n>"
+        return int(result.split()[-1]) if result else 0
+
+    async def bulk_copy_parallel(
         self,
-        conn: asyncpg.Connection,
         table_name: str,
-        records: List[Tuple]
+        source: Union[str, AsyncIterable[bytes]],
+        columns: Optional[List[str]] = None,
+        workers: int = 8,
+        batch_size: int = 50000
     ) -> int:
-        """Fallback slow insert method for error recovery."""
-        columns = ", ".join(self.COLUMNS)
-        placeholders = ", ".join(f"${i+1}" for i in range(len(self.COLUMNS)))
+        """
+        COPY CSV rows into a table with timescaledb-parallel-copy.
+
+        The tool splits the input over several connections, so on a
+        hypertable the rows are routed to chunks by several backends at once
+        instead of one. Like copy_records() there is no conflict handling,
+        and rows commit per batch in no particular order: meant for bulk
+        loads with the indexes dropped.
+
+        Args:
+            table_name: Target table
+            source: Path of a CSV file, or CSV bytes chunks (e.g. from
+                SCIDParser.to_csv()) streamed to the tool's stdin
+            columns: Column names, in CSV field order; defaults to COLUMNS
+            workers: Parallel COPY connections
+            batch_size: Rows per COPY transaction
+
+        Returns:
+            Number of records copied
+        """
+        exe = shutil.which(PARALLEL_COPY_BIN)
+        if exe is None:
+            raise FileNotFoundError(f"{PARALLEL_COPY_BIN} not found on PATH")
+
+        args = [
+            exe,
+            # No sslmode: libpq's default (prefer) or PGSSLMODE applies, as
+            # for the asyncpg connections
+            "--connection", f"host={self.config.host} port={self.config.port} "
+                            f"user={self.config.user}",
+            "--db-name", self.config.database,
+            "--table", table_name,
+            "--columns", ",".join(columns or self.COLUMNS),
+            "--workers", str(workers),
+            "--batch-size", str(batch_size),
+            "--copy-options", "CSV",
+        ]
+        if isinstance(source, str):
+            args += ["--file", source]
+        # Password through the environment, not the process list
+        env = dict(os.environ, PGPASSWORD=self.config.password)
+        proc = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL if isinstance(source, str) else asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=env
+        )
+        # Drain the tool's output while feeding it, so neither pipe fills up
+        reader = asyncio.create_task(proc.stdout.read())
+        stdin_closed = False
+        try:
+            if not isinstance(source, str):
+                try:
+                    async for chunk in source:
+                        proc.stdin.write(chunk)
+                        await proc.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    # The tool exited early; its output says why
+                    stdin_closed = True
+                finally:
+                    proc.stdin.close()
+            output = (await reader).decode(errors="replace")
+            await proc.wait()
+        except BaseException:
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+            reader.cancel()
+            raise
+
+        if proc.returncode != 0 or stdin_closed:
+            raise RuntimeError(f"{PARALLEL_COPY_BIN} exited with {proc.returncode}: {output.strip()}")
+        # Final report is "COPY <n>, took ..."
+        match = re.search(r"COPY (\d+)", output)
+        return int(match.group(1)) if match else 0
+
+    async def _merge_via_staging(self, table_name: str, load) -> int:
+        """
+        Run load(staging, None) and move the staged rows into table_name.
 
-        insert_sql = f"""
-            INSERT INTO "{table_name}" ({columns})
-            VALUES ({placeholders})
+        Both steps share one transaction; ON COMMIT DELETE ROWS then empties
+        the staging table for the next batch. With config.direct_copy the
+        rows are loaded straight into table_name instead.
+        """
+        if self.config.direct_copy:
+            return await load(table_name, "public")
+
+        conn = self._conn or await self.connect()
+        staging = await self._staging_table(conn, table_name)
+
+        # The staging copy of a generated column is a plain one, so it can
+        # take whatever was loaded; only the target's own columns move over
+        columns_str = ", ".join(await self.insert_columns(table_name))
+        query = f"""
+            INSERT INTO "{table_name}" ({columns_str})
+            SELECT {columns_str}
+            FROM "{staging}"
             ON CONFLICT (datetime, raw_time) DO NOTHING
         """
 
+        async with conn.transaction():
+            await load(staging, None)
+            result = await conn.execute(query)
+
+        # Command tag is "INSERT 0 <n>"
+        parts = result.split() if result else []
+        return int(parts[-1]) if len(parts) > 2 else 0
+
+    async def _staging_table(self, conn: asyncpg.Connection, table_name: str) -> str:
+        """Name of this connection's staging table for table_name, creating it once."""
+        staging = self._staging.get(table_name)
+        if staging is None:
+            staging = f"staging_{table_name.lower()}"
+            await conn.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS "{staging}"
+                (LIKE "{table_name}" INCLUDING DEFAULTS)
+                ON COMMIT DELETE ROWS
+            """)
+            self._staging[table_name] = staging
+        return staging
+
+    async def insert_columns(self, table_name: str) -> List[str]:
+        """
+        COLUMNS that table_name accepts on insert.
+
+        A datetime column generated from raw_time (psql/generated_datetime.sql)
+        is computed by the server and cannot be written, so it is left out.
+
+        Args:
+            table_name: Table name (ES or NQ)
+
+        Returns:
+            Column names in COLUMNS order
+        """
+        columns = self._insert_columns.get(table_name)
+        if columns is None:
+            conn = self._conn or await self.connect()
+            generated = await conn.fetch(
+                """
+                SELECT attname FROM pg_attribute
+                WHERE attrelid = $1::regclass AND attgenerated <> ''
+                """,
+                f'"{table_name}"'
+            )
+            skip = {row["attname"] for row in generated}
+            columns = [c for c in self.COLUMNS if c not in skip]
+            self._insert_columns[table_name] = columns
+        return columns
+
+    async def _split_insert(self, table_name: str, records: List[Tuple]) -> int:
+        """Insert records in halves until the rows COPY rejects are isolated and skipped."""
+        if len(records) == 1:
+            print(f"  Skipping bad record: {records[0]}")
+            return 0
+        mid = len(records) // 2
         inserted = 0
-        for record in records:
+        for half in (records[:mid], records[mid:]):
             try:
-                await conn.execute(insert_sql, *record)
-                inserted += 1
+                inserted += await self.insert_records(table_name, list(half))
             except Exception as e:
-                print(f"  Skipping bad record: {e}")
+                print(f"  Skipping {len(half)} records: {e}")
         return inserted
 
+    async def is_hypertable(self, table_name: str) -> bool:
+        """
+        Check whether table_name is a TimescaleDB hypertable.
+
+        Args:
+            table_name: Table name (ES or NQ)
+
+        Returns:
+            True for a hypertable; False for a plain table or without TimescaleDB
+        """
+        conn = self._conn or await self.connect()
+        try:
+            result = await conn.fetchval(
+                "SELECT 1 FROM timescaledb_information.hypertables WHERE hypertable_name = $1",
+                table_name
+            )
+        except (asyncpg.UndefinedTableError, asyncpg.InvalidSchemaNameError):
+            return False
+        return result is not None
+
+    async def set_unlogged(self, table_name: str) -> bool:
+        """
+        Switch a table to UNLOGGED so bulk loads skip WAL.
+
+        Rewrites the table and takes an exclusive lock, so it is meant for an
+        initial load with no concurrent readers; an UNLOGGED table is emptied
+        by crash recovery. Hypertables can't be made UNLOGGED and are left as
+        they are.
+
+        Args:
+            table_name: Table name (ES or NQ)
+
+        Returns:
+            True if the table was switched
+        """
+        if await self.is_hypertable(table_name):
+            print(f"{table_name} is a hypertable; TimescaleDB does not allow UNLOGGED, keeping it logged")
+            return False
+        conn = self._conn or await self.connect()
+        await conn.execute(f'ALTER TABLE "{table_name}" SET UNLOGGED')
+        return True
+
+    async def set_logged(self, table_name: str) -> None:
+        """
+        Switch a table back to LOGGED after a bulk load.
+
+        The table is written to WAL once here instead of batch by batch.
+
+        Args:
+            table_name: Table name (ES or NQ)
+        """
+        conn = self._conn or await self.connect()
+        await conn.execute(f'ALTER TABLE "{table_name}" SET LOGGED')
+
+    async def drop_indexes(self, table_name: str) -> List[Dict[str, Optional[str]]]:
+        """
+        Drop every non-primary-key index (and UNIQUE constraint) on a table.
+
+        Bulk loads then skip per-row index maintenance; rebuild_indexes()
+        puts them back. The definitions are printed as well, so they can be
+        recreated by hand if the import dies before the rebuild.
+
+        Args:
+            table_name: Table name (ES or NQ)
+
+        Returns:
+            One dict per dropped index: indexdef (its CREATE INDEX statement),
+            plus constraint_name/constraintdef if it backed a constraint
+        """
+        conn = self._conn or await self.connect()
+        rows = await conn.fetch(
+            """
+            SELECT i.indexrelid::regclass::text AS index_name,
+                   pg_get_indexdef(i.indexrelid) AS indexdef,
+                   c.conname AS constraint_name,
+                   pg_get_constraintdef(c.oid) AS constraintdef
+            FROM pg_index i
+            LEFT JOIN pg_constraint c ON c.conindid = i.indexrelid AND c.conrelid = i.indrelid
+            WHERE i.indrelid = $1::regclass AND NOT i.indisprimary
+            """,
+            f'"{table_name}"'
+        )
+
+        dropped = []
+        for row in rows:
+            if row["constraint_name"]:
+                print(f"  Dropping constraint {row['constraint_name']}: {row['constraintdef']}")
+                await conn.execute(f'ALTER TABLE "{table_name}" DROP CONSTRAINT "{row["constraint_name"]}"')
+            else:
+                print(f"  Dropping: {row['indexdef']}")
+                await conn.execute(f"DROP INDEX {row['index_name']}")
+            dropped.append({
+                "indexdef": row["indexdef"],
+                "constraint_name": row["constraint_name"],
+                "constraintdef": row["constraintdef"],
+            })
+        return dropped
+
+    async def rebuild_indexes(self, table_name: str, indexes: List[Dict[str, Optional[str]]]) -> None:
+        """
+        Recreate indexes returned by drop_indexes().
+
+        On plain tables indexes are built CONCURRENTLY and UNIQUE constraints
+        re-attached to them. Hypertables support neither, so there indexes
+        get a normal CREATE INDEX and constraints are re-added directly (as
+        are non-UNIQUE constraints everywhere).
+
+        Args:
+            table_name: Table name (ES or NQ)
+            indexes: drop_indexes() result
+        """
+        conn = self._conn or await self.connect()
+        hypertable = await self.is_hypertable(table_name)
+        for index in indexes:
+            name = index["constraint_name"]
+            if name and (hypertable or not index["constraintdef"].startswith("UNIQUE")):
+                print(f"  Re-adding constraint {name}: {index['constraintdef']}")
+                await conn.execute(f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{name}" {index["constraintdef"]}')
+                continue
+
+            indexdef = index["indexdef"]
+            if not hypertable:
+                indexdef = indexdef.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+            print(f"  Rebuilding: {indexdef}")
+            await conn.execute(indexdef)
+            if name:
+                # The index backing a constraint carries the constraint's name
+                await conn.execute(f'ALTER TABLE "{table_name}" ADD CONSTRAINT "{name}" UNIQUE USING INDEX "{name}"')
+
+    async def delete_duplicates(self, table_name: str) -> int:
+        """
+        Delete rows repeating an earlier (datetime, raw_time), keeping one.
+
+        The bulk-load replacement for ON CONFLICT DO NOTHING; run it before
+        rebuilding the unique index. Rows are addressed by (tableoid, ctid)
+        because ctid alone is only unique within one hypertable chunk.
+
+        Args:
+            table_name: Table name (ES or NQ)
+
+        Returns:
+            Number of rows deleted
+        """
+        conn = self._conn or await self.connect()
+        result = await conn.execute(f"""
+            DELETE FROM "{table_name}"
+            WHERE (tableoid, ctid) IN (
+                SELECT tableoid, ctid FROM (
+                    SELECT tableoid, ctid,
+                           row_number() OVER (PARTITION BY datetime, raw_time) AS rn
+                    FROM "{table_name}"
+                ) s
+                WHERE rn > 1
+            )
+        """)
+        # Command tag is "DELETE <n>"
+        return int(result.split()[-1]) if result else 0
+
     async def get_last_timestamp(self, table_name: str) -> Optional[int]:
         """
         Get the last raw_time value in the table.
@@ -1,4 +1,5 @@
 import sys
+import csv
 import pandas as pd
 import numpy as np
 from pathlib import Path
@@ -81,8 +82,81 @@ def read_h5(file_path, key=None):
              print(f"Error reading HDF5 (key='{key}'): {e}")
         return None
 
+def _pick_key(keys, key=None):
+    """Return key, else 'ticks'/'data', else the first available key."""
+    if key is not None:
+        return key
+    for pk in ['ticks', 'data']:
+        if pk in keys:
+            return pk
+    return keys[0] if keys else 'ticks'
+
+def stream_h5_to_csv(h5_path, csv_path, key=None, chunk=1_000_000):
+    """
+    Write an HDF5 table to CSV chunk by chunk, never holding the whole table.
+
+    The h5py fallback layout ('values'/'columns'/'index') is sliced directly
+    with h5py; pandas 'table' format files are read with HDFStore.select in
+    chunks. Returns the number of rows written, or None if the file can't be
+    streamed (e.g. pandas 'fixed' format, or no HDF5 library installed).
+    """
+    try:
+        import h5py
+        with h5py.File(h5_path, 'r') as hf:
+            target_key = _pick_key(list(hf.keys()), key)
+            group = hf.get(target_key)
+            if isinstance(group, h5py.Group) and 'values' in group:
+                values = group['values']
+                index_raw = group['index']
+                columns = group['columns'][:].astype(str)
+
+                with open(csv_path, 'w', newline='', buffering=1 << 20) as f:
+                    writer = csv.writer(f, lineterminator='\n')
+                    writer.writerow(['DateTime', *columns])
+                    for start in range(0, len(values), chunk):
+                        block = values[start:start + chunk]
+                        index = pd.to_datetime(index_raw[start:start + chunk], unit='ns', utc=True)
+                        writer.writerows(zip(index.astype(str), *block.astype(str).T))
+
+                print(f"Streamed HDF5 (key='{target_key}') via h5py: {h5_path}")
+                return len(values)
+    except ImportError:
+        pass
+
+    try:
+        import tables
+        with pd.HDFStore(h5_path, mode='r') as store:
+            target_key = _pick_key([k.lstrip('/') for k in store.keys()], key)
+            rows = 0
+            with open(csv_path, 'w', newline='', buffering=1 << 20) as f:
+                for part in store.select(target_key, chunksize=chunk):
+                    part.to_csv(f, header=rows == 0, lineterminator='\n')
+                    rows += len(part)
+        print(f"Streamed HDF5 (key='{target_key}') via tables: {h5_path}")
+        return rows
+    except ImportError:
+        return None
+    except TypeError:
+        # 'fixed' format stores can't be read in chunks
+        return None
+
 def convert_h5_to_csv(h5_path, csv_path, key=None):
     print(f"Converting {h5_path} to {csv_path}...")
+    try:
+        rows = stream_h5_to_csv(h5_path, csv_path, key=key)
+    except Exception as e:
+        print(f"Error streaming HDF5: {e}")
+        rows = None
+
+    if rows is not None:
+        print(f"Successfully saved {rows:,} rows to {csv_path}")
+        print("\n--- First 5 rows ---")
+        with open(csv_path) as f:
+            for line in f.readlines(1 << 12)[:6]:
+                print(line, end='')
+        return
+
+    # Not streamable: load the whole table
     df = read_h5(h5_path, key=key)
 
     if df is not None:
@@ -0,0 +1,30 @@
+"""
+Optional Numba support.
+
+Exposes an ``njit`` decorator that compiles with Numba when it is installed
+and otherwise returns the function unchanged, so kernels still run (slowly)
+as plain Python. Callers that have a faster pure-NumPy alternative should
+check ``NUMBA_AVAILABLE`` and pick that path instead.
+"""
+
+try:
+    from numba import njit as _numba_njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    _numba_njit = None
+    NUMBA_AVAILABLE = False
+
+
+def njit(*args, **kwargs):
+    """numba.njit when Numba is installed, otherwise a no-op decorator."""
+    if NUMBA_AVAILABLE:
+        return _numba_njit(*args, **kwargs)
+
+    # Bare @njit usage
+    if len(args) == 1 and callable(args[0]) and not kwargs:
+        return args[0]
+
+    # @njit(cache=True, ...) usage
+    def decorator(func):
+        return func
+    return decorator
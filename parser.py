@@ -12,12 +12,19 @@ Bundle Trade Markers in Open field:
 
 import struct
 import os
+import mmap
 import datetime
 import re
+import itertools
 from dataclasses import dataclass
-from typing import Generator, Tuple, Optional, List, Dict
+from typing import Generator, Iterator, Tuple, Optional, List, Dict
 from pathlib import Path
 
+import numpy as np
+
+from numba_compat import njit, NUMBA_AVAILABLE
+from uring_reader import IoUringReader, URING_AVAILABLE
+
 # Constants
 HEADER_FORMAT = '<4s2I2HI36s'
 HEADER_SIZE = 56
@@ -25,11 +32,106 @@ RECORD_FORMAT = '<Q4f4I'
 RECORD_SIZE = 40
 SC_EPOCH = datetime.datetime(1899, 12, 30, tzinfo=datetime.timezone.utc)
 
+# NumPy layout of one record (same fields as RECORD_FORMAT)
+RECORD_DTYPE = np.dtype([
+    ('raw_time', '<u8'),
+    ('open', '<f4'),
+    ('high', '<f4'),
+    ('low', '<f4'),
+    ('close', '<f4'),
+    ('num_trades', '<u4'),
+    ('volume', '<u4'),
+    ('bid_volume', '<u4'),
+    ('ask_volume', '<u4'),
+])
+
+# 1970-01-01 expressed as a Sierra Chart timestamp (microseconds since 1899-12-30)
+SC_UNIX_EPOCH_US = 25569 * 86400 * 1_000_000
+
+# 2000-01-01 (the PostgreSQL timestamp epoch) as a Sierra Chart timestamp
+PG_EPOCH_SC_US = 36526 * 86400 * 1_000_000
+
+# Binary COPY framing: signature, flags, header extension length / end marker
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('>ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('>h', -1)
+
+# Readahead window for mapped scans (a multiple of any page size)
+MMAP_WINDOW = 256 << 20
+
+# Open-ended bounds for select_time_range (raw_time is unsigned)
+RAW_TIME_MIN = 0
+RAW_TIME_MAX = np.iinfo(np.uint64).max
+
 # Bundle trade markers
 FIRST_BUNDLE_TRADE = -19990009513251226345509817234554355712.0
 LAST_BUNDLE_TRADE = -19990019654456028171345029208179998720.0
 
 
+@njit(cache=True)
+def select_time_range(raw_time, start_raw, end_raw):
+    """Indices i with start_raw <= raw_time[i] < end_raw, in one pass."""
+    keep = np.empty(len(raw_time), dtype=np.int64)
+    n = 0
+    for i in range(len(raw_time)):
+        t = raw_time[i]
+        if t >= start_raw and t < end_raw:
+            keep[n] = i
+            n += 1
+    return keep[:n]
+
+
+@njit(cache=True)
+def _put_be(out, pos, value, nbytes):
+    """Write the low nbytes of value big-endian at out[pos]; returns the next position."""
+    for k in range(nbytes):
+        out[pos + k] = (value >> (8 * (nbytes - 1 - k))) & 0xFF
+    return pos + nbytes
+
+
+@njit(cache=True, nogil=True)
+def encode_pgcopy_rows(out, pos, row_size, raw_time, open_, high, low, close,
+                       num_trades, volume, bid_volume, ask_volume, contract, has_contract,
+                       with_datetime):
+    """
+    Write binary COPY rows (SCIDParser.pgcopy_dtype() layout) into out[pos:].
+
+    Each row is encoded in one pass. The GIL is released, so parser threads
+    for different contracts encode on separate cores at the same time.
+    """
+    for i in range(len(raw_time)):
+        p = pos + i * row_size
+        raw = np.int64(raw_time[i])
+        if with_datetime:
+            p = _put_be(out, p, 11, 2)
+            p = _put_be(out, p, 8, 4)
+            p = _put_be(out, p, raw - PG_EPOCH_SC_US, 8)
+        else:
+            p = _put_be(out, p, 10, 2)
+        p = _put_be(out, p, 8, 4)
+        p = _put_be(out, p, raw, 8)
+        for price in (open_[i], high[i], low[i], close[i]):
+            p = _put_be(out, p, 8, 4)
+            p = _put_be(out, p, np.float64(price).view(np.int64), 8)
+        for count in (num_trades[i], volume[i], bid_volume[i], ask_volume[i]):
+            p = _put_be(out, p, 4, 4)
+            p = _put_be(out, p, np.int64(count), 4)
+        if has_contract:
+            p = _put_be(out, p, len(contract), 4)
+            for k in range(len(contract)):
+                out[p + k] = contract[k]
+        else:
+            p = _put_be(out, p, -1, 4)
+
+
+def join_pgcopy(payloads: List[bytes]) -> bytearray:
+    """Merge binary COPY payloads (same columns) into one, keeping a single header and trailer."""
+    out = bytearray(PGCOPY_HEADER)
+    for payload in payloads:
+        out += memoryview(payload)[len(PGCOPY_HEADER):len(payload) - len(PGCOPY_TRAILER)]
+    out += PGCOPY_TRAILER
+    return out
+
+
 @dataclass
 class SCIDHeader:
     """SCID file header structure."""
@@ -42,7 +144,7 @@ class SCIDHeader:
     reserve: bytes
 
 
-@dataclass
+@dataclass(slots=True)
 class SCIDRecord:
     """SCID tick record with all OHLC fields."""
     datetime: datetime.datetime
@@ -107,6 +209,8 @@ class SCIDParser:
         """
         self.file_path = file_path
         self.header: Optional[SCIDHeader] = None
+        # File offset just past the block read_record_arrays() last yielded from
+        self.position = HEADER_SIZE
 
         # Extract contract from filename if not provided
         if contract:
@@ -134,6 +238,11 @@ class SCIDParser:
         """
         return SC_EPOCH + datetime.timedelta(microseconds=sc_time_val)
 
+    @staticmethod
+    def _to_sc_timestamp(dt: datetime.datetime) -> int:
+        """Convert a timezone-aware datetime to a Sierra Chart timestamp."""
+        return (dt - SC_EPOCH) // datetime.timedelta(microseconds=1)
+
     def parse_header(self, f) -> SCIDHeader:
         """Read and parse the 56-byte file header."""
         data = f.read(HEADER_SIZE)
@@ -164,76 +273,329 @@ class SCIDParser:
         """
         Generator that yields SCIDRecord objects.
 
+        A compatibility layer over read_record_arrays(): the file is read and
+        date-filtered as NumPy arrays, and SCIDRecord objects are only built
+        for the records the caller actually iterates over. Bulk consumers
+        should use read_record_arrays() directly.
+
         Args:
             start_date: Optional start date filter (inclusive)
             end_date: Optional end date filter (exclusive)
             offset: Byte offset to start reading from (for resuming)
-            buffer_size: Size of buffer to read (must be multiple of 40)
+            buffer_size: Bytes read per batch (rounded down to whole records)
 
         Yields:
             SCIDRecord objects matching the date filter
         """
+        batch_size = max(1, buffer_size // RECORD_SIZE)
+        for arr in self.read_record_arrays(batch_size, start_date, end_date, offset):
+            for fields in self.iter_db_tuples(arr):
+                yield SCIDRecord(*fields)
+
+    def read_record_arrays(
+        self,
+        batch_size: int = 10000,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        offset: int = 0
+    ) -> Generator[np.ndarray, None, None]:
+        """
+        Yield non-empty RECORD_DTYPE arrays of up to batch_size records, date-filtered.
+
+        Reading starts at byte offset (e.g. a saved self.position); after each
+        yield, self.position is where to resume once that array is stored.
+        """
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"File not found: {self.file_path}")
 
-        # Ensure buffer size is aligned to record size
-        if buffer_size % RECORD_SIZE != 0:
-            buffer_size = (buffer_size // RECORD_SIZE) * RECORD_SIZE
+        start_raw = self._to_sc_timestamp(start_date) if start_date else None
+        end_raw = self._to_sc_timestamp(end_date) if end_date else None
+        chunk_bytes = batch_size * RECORD_SIZE
 
         with open(self.file_path, 'rb') as f:
-            # Parse header
             self.parse_header(f)
+            size = os.fstat(f.fileno()).st_size
+        pos = max(HEADER_SIZE, offset)
+        end = size - max(0, size - pos) % RECORD_SIZE
+        if end - pos < RECORD_SIZE:
+            return
+
+        blocks = self._uring_blocks(pos, end, chunk_bytes) if URING_AVAILABLE else None
+        if blocks is None:
+            blocks = self._mmap_blocks(pos, end, chunk_bytes)
+
+        for buf in blocks:
+            arr = self.read_block(buf, start_raw, end_raw)
+            pos += len(buf)
+            if len(arr):
+                self.position = pos
+                yield arr
+
+    def _uring_blocks(self, pos: int, end: int, chunk_bytes: int) -> Optional[Iterator[bytearray]]:
+        """
+        Read file[pos:end] through io_uring with reads queued ahead of the
+        parser, or None if the kernel has no io_uring (pre-5.6, seccomp).
+        """
+        try:
+            reader = IoUringReader(self.file_path, pos, end, chunk_bytes)
+        except OSError:
+            return None
 
-            # Seek to offset if provided (must be >= HEADER_SIZE)
-            current_pos = max(HEADER_SIZE, offset)
-            f.seek(current_pos)
-
-            # Pre-calculate date timestamps for faster filtering
-            # Note: SC timestamp is microseconds since 1899-12-30
-            # Converting filter dates to raw int can speed up comparison if we wanted to
-            # but we need to convert to datetime for the object anyway.
-
-            while True:
-                buffer = f.read(buffer_size)
-                if not buffer:
-                    break
-
-                # Handle cases where read returns less than buffer_size but not empty
-                # Ensure we only process complete records
-                valid_bytes = len(buffer) - (len(buffer) % RECORD_SIZE)
-                if valid_bytes == 0:
-                    break
-
-                # Process the chunk
-                for fields in struct.iter_unpack(RECORD_FORMAT, buffer[:valid_bytes]):
-                    raw_time = fields[0]
-                    dt_val = self._convert_sc_timestamp(raw_time)
-
-                    # Apply date filters
-                    if start_date and dt_val < start_date:
-                        continue
-                    if end_date and dt_val >= end_date:
-                        continue
-
-                    # Yield record
-                    yield SCIDRecord(
-                        datetime=dt_val,
-                        raw_time=raw_time,
-                        open=fields[1],
-                        high=fields[2],
-                        low=fields[3],
-                        close=fields[4],
-                        num_trades=fields[5],
-                        volume=fields[6],
-                        bid_volume=fields[7],
-                        ask_volume=fields[8],
-                        contract=self.contract
-                    )
-
-                # If we read a partial record at the end of file (shouldn't happen for valid SCID), stop
-                if len(buffer) < buffer_size:
-                    break
+        def blocks():
+            with reader:
+                yield from reader
+        return blocks()
+
+    def _mmap_blocks(self, pos: int, end: int, chunk_bytes: int) -> Iterator[memoryview]:
+        """Slice file[pos:end] out of a read-only mapping of the file."""
+        with open(self.file_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        # Yielded arrays are views into the mapping, which therefore stays
+        # open until the last of them is released
+        view = memoryview(mm)
+        advise = hasattr(mm, 'madvise')
+        if advise:
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        advised_to = 0
+
+        while pos < end:
+            if advise and advised_to < end and pos >= advised_to - MMAP_WINDOW:
+                # Keep at least one window of prefetch ahead of the scan
+                start = max(advised_to, pos - pos % MMAP_WINDOW)
+                advised_to = min(start + 2 * MMAP_WINDOW, len(mm))
+                mm.madvise(mmap.MADV_WILLNEED, start, advised_to - start)
+
+            stop = min(pos + chunk_bytes, end)
+            yield view[pos:stop]
+            pos = stop
+
+    @staticmethod
+    def read_block(
+        buf,
+        start_raw: Optional[int] = None,
+        end_raw: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        View the whole records in buf as a RECORD_DTYPE array, keeping only
+        start_raw <= raw_time < end_raw (raw Sierra Chart timestamps).
 
+        Time-ordered blocks come back as a zero-copy slice of buf.
+        """
+        arr = np.frombuffer(buf, dtype=RECORD_DTYPE, count=len(buf) // RECORD_SIZE)
+        if start_raw is None and end_raw is None:
+            return arr
+
+        raw_time = arr['raw_time']
+        start = np.uint64(RAW_TIME_MIN if start_raw is None else start_raw)
+        end = np.uint64(RAW_TIME_MAX if end_raw is None else end_raw)
+
+        # SCID files are written in time order, so the window is normally one
+        # contiguous run: find its edges by binary search and slice. The run
+        # is checked with min/max reductions (no mask, no copy) and anything
+        # out of order falls through to the full filter below.
+        lo, hi = np.searchsorted(raw_time, [start, end])
+        if lo <= hi and SCIDParser._is_time_run(raw_time, lo, hi, start, end):
+            return arr[lo:hi]
+
+        if NUMBA_AVAILABLE:
+            keep = select_time_range(raw_time, start, end)
+            return arr[keep]
+        return arr[(raw_time >= start) & (raw_time < end)]
+
+    @staticmethod
+    def _is_time_run(raw_time: np.ndarray, lo: int, hi: int, start, end) -> bool:
+        """True if exactly raw_time[lo:hi] lies in [start, end)."""
+        if lo > 0 and raw_time[:lo].max() >= start:
+            return False
+        if hi < len(raw_time) and raw_time[hi:].min() < end:
+            return False
+        if hi > lo:
+            inside = raw_time[lo:hi]
+            return inside.min() >= start and inside.max() < end
+        return True
+
+    def read_records_batch(
+        self,
+        batch_size: int = 100000,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        offset: int = 0
+    ) -> Generator[List[tuple], None, None]:
+        """
+        Generator that yields batches of records as DB tuples.
+
+        Decodes batch_size records at a time with NumPy and filters them on the
+        raw timestamp, instead of building one SCIDRecord per tick. Tuples have
+        the SCIDRecord.to_db_tuple() layout and values.
+
+        Args:
+            batch_size: Records to read per batch (batches shrink after filtering)
+            start_date: Optional start date filter (inclusive)
+            end_date: Optional end date filter (exclusive)
+            offset: Byte offset to start reading from (for resuming)
+
+        Yields:
+            Non-empty lists of DB tuples matching the date filter
+        """
+        for arr in self.read_record_arrays(batch_size, start_date, end_date, offset):
+            yield self._to_db_tuples(arr)
+
+    def read_columns_batch(
+        self,
+        batch_size: int = 100000,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        offset: int = 0
+    ) -> Generator[Dict[str, np.ndarray], None, None]:
+        """
+        Generator that yields batches of records as NumPy columns.
+
+        Same reading and filtering as read_records_batch, but each batch is a
+        dict keyed by the to_db_tuple() field names: 'datetime' is
+        datetime64[us] (UTC), 'contract' a string array, the rest keep their
+        on-disk dtypes. Suits column-oriented inserts with no row tuples at all.
+        """
+        for arr in self.read_record_arrays(batch_size, start_date, end_date, offset):
+            yield self.records_to_columns(arr)
+
+    def records_to_columns(self, arr: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Split a RECORD_DTYPE array into the read_columns_batch() column dict.
+
+        Numeric columns are views into arr, so arr's buffer must outlive them.
+        """
+        raw_time = arr['raw_time']
+        epoch_us = raw_time.astype(np.int64) - SC_UNIX_EPOCH_US
+        columns = {
+            'datetime': epoch_us.astype('datetime64[us]'),
+            'raw_time': raw_time,
+        }
+        for name in RECORD_DTYPE.names[1:]:
+            columns[name] = arr[name]
+        columns['contract'] = np.full(len(arr), self.contract)
+        return columns
+
+    def iter_db_tuples(self, arr: np.ndarray, chunk_rows: int = 8192) -> Iterator[tuple]:
+        """
+        Lazily yield to_db_tuple() tuples for a RECORD_DTYPE array.
+
+        Rows are converted chunk_rows at a time, so only one chunk of Python
+        objects exists at once however large arr is.
+        """
+        for start in range(0, len(arr), chunk_rows):
+            yield from self._to_db_tuples(arr[start:start + chunk_rows])
+
+    def _to_db_tuples(self, arr: np.ndarray) -> List[tuple]:
+        """Convert a RECORD_DTYPE array to SCIDRecord.to_db_tuple() tuples."""
+        raw_time = arr['raw_time']
+        epoch_us = raw_time.astype(np.int64) - SC_UNIX_EPOCH_US
+        utc = datetime.timezone.utc
+        datetimes = [d.replace(tzinfo=utc) for d in epoch_us.astype('datetime64[us]').tolist()]
+
+        return list(zip(
+            datetimes,
+            raw_time.tolist(),
+            arr['open'].tolist(),
+            arr['high'].tolist(),
+            arr['low'].tolist(),
+            arr['close'].tolist(),
+            arr['num_trades'].tolist(),
+            arr['volume'].tolist(),
+            arr['bid_volume'].tolist(),
+            arr['ask_volume'].tolist(),
+            itertools.repeat(self.contract)
+        ))
+
+    def pgcopy_dtype(self, with_datetime: bool = True) -> np.dtype:
+        """
+        Big-endian layout of one binary COPY row for the tick tables.
+
+        Each field is its int32 length followed by the value in the column's
+        wire format (timestamptz/bigint as int64, double precision as float8,
+        integer as int4, varchar as raw UTF-8). The contract has the same
+        length on every row, so rows are fixed-width. with_datetime=False
+        leaves out the datetime field, for tables where it is generated from
+        raw_time on the server.
+        """
+        fields = [('nfields', '>i2')]
+        if with_datetime:
+            fields += [('datetime_len', '>i4'), ('datetime', '>i8')]
+        for name, fmt in (('raw_time', '>i8'),
+                          ('open', '>f8'), ('high', '>f8'), ('low', '>f8'), ('close', '>f8'),
+                          ('num_trades', '>i4'), ('volume', '>i4'),
+                          ('bid_volume', '>i4'), ('ask_volume', '>i4')):
+            fields += [(name + '_len', '>i4'), (name, fmt)]
+        fields.append(('contract_len', '>i4'))
+        if self.contract:
+            fields.append(('contract', f'S{len(self.contract.encode())}'))
+        return np.dtype(fields)
+
+    def to_pgcopy(self, arr: np.ndarray, with_datetime: bool = True) -> bytearray:
+        """
+        Encode a RECORD_DTYPE array as a complete binary COPY payload.
+
+        The rows are written into a single pre-sized buffer, so no per-row
+        Python objects are created: row by row in encode_pgcopy_rows() when
+        Numba is available, otherwise column by column with NumPy. The
+        columns are DBManager.COLUMNS, as with to_db_tuple(), without
+        datetime when with_datetime is False.
+        """
+        row = self.pgcopy_dtype(with_datetime)
+        n = len(arr)
+        buf = bytearray(len(PGCOPY_HEADER) + n * row.itemsize + len(PGCOPY_TRAILER))
+        buf[:len(PGCOPY_HEADER)] = PGCOPY_HEADER
+        buf[len(buf) - len(PGCOPY_TRAILER):] = PGCOPY_TRAILER
+
+        if NUMBA_AVAILABLE:
+            contract = np.frombuffer((self.contract or '').encode(), dtype=np.uint8)
+            encode_pgcopy_rows(
+                np.frombuffer(buf, dtype=np.uint8), len(PGCOPY_HEADER), row.itemsize,
+                arr['raw_time'], arr['open'], arr['high'], arr['low'], arr['close'],
+                arr['num_trades'], arr['volume'], arr['bid_volume'], arr['ask_volume'],
+                contract, bool(self.contract), with_datetime
+            )
+            return buf
+
+        rows = np.frombuffer(buf, dtype=row, count=n, offset=len(PGCOPY_HEADER))
+        rows['nfields'] = 11 if with_datetime else 10
+        raw_time = arr['raw_time'].astype(np.int64)
+        if with_datetime:
+            rows['datetime'] = raw_time - PG_EPOCH_SC_US
+        rows['raw_time'] = raw_time
+        for name in RECORD_DTYPE.names[1:]:
+            rows[name] = arr[name]
+        # Field lengths; -1 marks a NULL contract
+        for name in row.names:
+            if name.endswith('_len'):
+                field = name[:-len('_len')]
+                rows[name] = row[field].itemsize if field in row.names else -1
+        if self.contract:
+            rows['contract'] = self.contract.encode()
+        return buf
+
+    def to_csv(self, arr: np.ndarray, with_datetime: bool = True) -> bytes:
+        """
+        Encode a RECORD_DTYPE array as CSV lines, in DBManager.COLUMNS order.
+
+        For text-only loaders such as timescaledb-parallel-copy; where asyncpg
+        does the COPY, to_pgcopy() is cheaper. Prices are written as the
+        float64 values the binary path sends, and an empty contract field
+        loads as NULL.
+        """
+        if len(arr) == 0:
+            return b''
+        raw_time = arr['raw_time'].astype(np.int64)
+        columns = [raw_time.astype(str)]
+        if with_datetime:
+            epoch_us = (raw_time - SC_UNIX_EPOCH_US).astype('datetime64[us]')
+            columns.insert(0, np.datetime_as_string(epoch_us, unit='us', timezone='UTC'))
+        for name in RECORD_DTYPE.names[1:5]:
+            columns.append(arr[name].astype(np.float64).astype(str))
+        for name in RECORD_DTYPE.names[5:]:
+            columns.append(arr[name].astype(str))
+        columns.append(itertools.repeat(self.contract or ''))
+        return ('\n'.join(map(','.join, zip(*columns))) + '\n').encode()
 
     def get_file_position(self, f) -> int:
         """Get current file position for checkpointing."""
@@ -267,6 +629,15 @@ class MultiContractParser:
         if isinstance(date_val, datetime.datetime):
             return date_val
         if isinstance(date_val, str):
+            # Slice YYYY-MM-DD by hand; strptime compiles the format and takes
+            # the locale lock on every call. Anything else goes to strptime.
+            if (len(date_val) == 10 and date_val[4] == date_val[7] == '-'
+                    and (date_val[0:4] + date_val[5:7] + date_val[8:10]).isdigit()):
+                try:
+                    return datetime.datetime(int(date_val[0:4]), int(date_val[5:7]), int(date_val[8:10]),
+                                             tzinfo=datetime.timezone.utc)
+                except ValueError:
+                    pass
             dt = datetime.datetime.strptime(date_val, "%Y-%m-%d")
             return dt.replace(tzinfo=datetime.timezone.utc)
         return None
@@ -1,177 +1,312 @@
 import sys
-import os
-import json
 from pathlib import Path
 import numpy as np
 import pandas as pd
 import time
 
-def get_dates_from_config(file_path, config_path="config.json"):
-    """
-    Search config.json for a contract matching the given file path.
-    Returns (start_date, end_date) if found.
-    """
-    if not os.path.exists(config_path):
-        return None, None
+from scid_kernels import resample_1min, NUMBA_AVAILABLE
+from scid_pipeline import (open_scid, clean_stream, get_dates_from_config,  # noqa: F401 - re-exported
+                           CHUNK_RECORDS, SC_EPOCH_US)
 
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
+MINUTE_US = 60_000_000
 
-        target_path = str(Path(file_path).absolute()).lower()
+# Columns of a 1-minute bar, in output order
+BAR_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Trades', 'Volume', 'BidVolume', 'AskVolume')
 
-        for symbol, data in config.get("symbols", {}).items():
-            for contract in data.get("contracts", []):
-                contract_file = str(Path(contract.get("file", "")).absolute()).lower()
-                if contract_file == target_path:
-                    print(f"Found config for {symbol} contract: {contract.get('start_date')} to {contract.get('end_date')}")
-                    return contract.get("start_date"), contract.get("end_date")
-    except Exception as e:
-        print(f"Warning: Could not read config.json: {e}")
+# Bars keep the record dtypes: float32 prices, uint32 counts
+BAR_DTYPES = {'Open': 'float32', 'High': 'float32', 'Low': 'float32', 'Close': 'float32',
+              'Trades': 'uint32', 'Volume': 'uint32', 'BidVolume': 'uint32', 'AskVolume': 'uint32'}
 
-    return None, None
+# HDF5 compression (PyTables path) and chunk rows (h5py fallback)
+H5_COMPLIB = 'blosc:zstd'
+H5_COMPLEVEL = 3
+H5_CHUNK_ROWS = 65536
 
-def resample_scid_to_1min(file_path, output_path=None, start_date=None, end_date=None, limit=None, price_multiplier=1.0, use_config=True):
-    """
-    Highly efficient conversion of SCID tick data to 1-minute OHLCV data.
-    Uses memory mapping and vectorized operations to maximize performance.
+def aggregate_minutes(minute_idx, cols):
     """
-    f = Path(file_path)
-    if not f.exists():
-        print(f"Error: {f} not found")
-        return None
-
-    # Constants
-    HEADER_SIZE = 56
-    RECORD_SIZE = 40
-    SC_EPOCH_US = 2209161600000000 # Microseconds from 1970-01-01 back to 1899-12-30
-    MINUTE_US = 60_000_000
-
-    # Bundle trade markers (as defined in parser.py)
-    FIRST_BUNDLE_TRADE = -19990009513251226345509817234554355712.0
-    LAST_BUNDLE_TRADE = -19990019654456028171345029208179998720.0
-
-    # Precise dtypes matching parser.py (<Q4f4I)
-    sciddtype = np.dtype([
-        ("Time", "<u8"),      # Q
-        ("Open", "<f4"),      # f
-        ("High", "<f4"),      # f
-        ("Low", "<f4"),       # f
-        ("Close", "<f4"),     # f
-        ("Trades", "<u4"),    # I
-        ("Volume", "<u4"),    # I
-        ("BidVolume", "<u4"), # I
-        ("AskVolume", "<u4"), # I
-    ])
-
-    stat = f.stat()
-    file_size = stat.st_size
-
-    if file_size < HEADER_SIZE:
-        print(f"Error: {f} is too small to be a valid SCID file")
-        return None
+    Collapse time-sorted ticks into one OHLCV row per minute.
 
-    print(f"Loading {f.name} ({file_size / 1024 / 1024:.2f} MB)...")
-    start_time = time.perf_counter()
+    Ticks are in time order, so each minute is one contiguous run and the
+    group-by becomes segmented reductions starting at each run. Partial
+    bars (e.g. per slab) are combined by the same reductions when passed
+    back in. Returns (minute indices, dict of per-minute column arrays).
+    """
+    # SCID files are written in time order; sort (stably, so first/last
+    # within a minute keep their meaning) only if this one is not
+    if np.any(minute_idx[1:] < minute_idx[:-1]):
+        order = np.argsort(minute_idx, kind='stable')
+        minute_idx = minute_idx[order]
+        cols = {name: values[order] for name, values in cols.items()}
+
+    starts = np.concatenate(([0], np.flatnonzero(minute_idx[1:] != minute_idx[:-1]) + 1))
+    ends = np.append(starts[1:], len(minute_idx)) - 1
+    bars = {
+        'Open': cols['Open'][starts],
+        'High': np.maximum.reduceat(cols['High'], starts),
+        'Low': np.minimum.reduceat(cols['Low'], starts),
+        'Close': cols['Close'][ends],
+    }
+    for name in ('Trades', 'Volume', 'BidVolume', 'AskVolume'):
+        bars[name] = np.add.reduceat(cols[name], starts, dtype=cols[name].dtype)
+    return minute_idx[starts], bars
+
+def _slab_bars_numba(slab, raw_start, raw_end, price_multiplier, minute_us):
+    """
+    Per-minute partial bars for one slab of records, in a single pass of the
+    resample_1min kernel.
 
-    # Use memmap for instant access without loading entire file into RAM
-    data = np.memmap(f, dtype=sciddtype, offset=HEADER_SIZE, mode="r")
+    Returns (rows in the date range, valid ticks, minute indices, bars).
+    """
+    in_range, kept, minute_idx, *values = resample_1min(
+        slab['Time'], slab['Open'], slab['High'], slab['Low'], slab['Close'],
+        slab['Trades'], slab['Volume'], slab['BidVolume'], slab['AskVolume'],
+        np.uint64(raw_start if raw_start is not None else 0),
+        np.uint64(raw_end if raw_end is not None else np.iinfo(np.uint64).max),
+        np.uint64(minute_us)
+    )
+    bars = dict(zip(BAR_COLUMNS, values))
+    # Scaling after the reduction gives the same bars (max/min/first/last
+    # commute with a positive multiplier) on far fewer values
+    if price_multiplier != 1.0:
+        for col in ['Open', 'High', 'Low', 'Close']:
+            np.multiply(bars[col], price_multiplier, out=bars[col])
+    return in_range, kept, minute_idx, bars
+
+def _iter_slabs(selection, price_multiplier):
+    """Yield (rows in range, valid ticks, minute indices, bars) per slab of CHUNK_RECORDS."""
+    if NUMBA_AVAILABLE:
+        # One fused pass per slab: filter, clean and aggregate
+        for slab in selection.slabs(CHUNK_RECORDS):
+            yield _slab_bars_numba(slab, selection.raw_start, selection.raw_end, price_multiplier, MINUTE_US)
+        return
+
+    for rows_in_range, batch in clean_stream(selection, price_multiplier, CHUNK_RECORDS):
+        if batch is None:
+            yield rows_in_range, 0, None, None
+            continue
+        # VECTORIZED OPTIMIZATION:
+        # Instead of converting every tick to datetime (slow),
+        # we work with integer minutes.
+        # Minute index = Time // 60,000,000
+        minute_idx = batch.pop('Time') // MINUTE_US
+        yield (rows_in_range, len(minute_idx)) + aggregate_minutes(minute_idx, batch)
+
+def merge_bars(partials):
+    """
+    Merge (minute indices, bars) partials from several slabs into final bars.
 
-    if limit:
-        print(f"Limiting to first {limit:,} records for verification...")
-        data = data[:limit]
+    A minute that straddles two slabs (or recurs out of order) is combined
+    by the same reductions.
+    """
+    minute_idx = np.concatenate([minutes for minutes, _ in partials])
+    cols = {name: np.concatenate([bars[name] for _, bars in partials])
+            for name in partials[0][1]}
+    return aggregate_minutes(minute_idx, cols)
+
+def bars_frame(minutes, bars):
+    """DataFrame of bars indexed by their UTC minute."""
+    frame = pd.DataFrame(bars, index=minutes, copy=False).astype(BAR_DTYPES)
+    # Only now do we convert the resulting minute indices to actual datetimes
+    # This happens only once per minute (e.g., 1,440 times per day) instead of per tick
+    t = minutes.astype(np.int64) * MINUTE_US
+    t -= SC_EPOCH_US
+    frame.index = pd.DatetimeIndex(t.view('datetime64[us]'), name='DateTime').tz_localize('UTC')
+    return frame
 
-    # Create DataFrame from memmap (copy=False is critical for performance)
-    df = pd.DataFrame(data, copy=False)
+class _BarWriter:
+    """
+    Append chunks of bars to a CSV or HDF5 file.
 
-    # Try to get dates from config if not provided
-    if use_config and not start_date and not end_date:
-        start_date, end_date = get_dates_from_config(file_path)
+    Files have the same layout as resampled.to_csv() / save_to_hdf5(), built
+    one chunk at a time. Nothing is created until the first append.
+    """
 
-    # Fast filtering by raw timestamp if dates provided
-    if start_date or end_date:
-        # Convert date strings/objects to SC raw microseconds
-        # SC Time = (Unix Time + SC_EPOCH_US)
-        def to_raw(dt_str):
-            ts = int(pd.to_datetime(dt_str, utc=True).timestamp() * 1_000_000)
-            return ts + SC_EPOCH_US
+    def __init__(self, output_path, expectedrows=None, key='data'):
+        self.output_path = output_path
+        self.expectedrows = expectedrows
+        self.key = key
+        self.is_hdf5 = Path(output_path).suffix.lower() in ['.h5', '.hdf5']
+        self.rows = 0
+        self._csv = None
+        self._store = None
+        self._h5 = None
+
+    def append(self, df):
+        if len(df) == 0:
+            return
+        if not self.is_hdf5:
+            if self._csv is None:
+                self._csv = open(self.output_path, 'w', newline='', encoding='utf-8', buffering=1 << 20)
+            df.to_csv(self._csv, header=self.rows == 0)
+        elif self._h5 is not None or not self._append_tables(df):
+            self._append_h5py(df)
+        self.rows += len(df)
+
+    def _append_tables(self, df):
+        """Append through PyTables; False if it isn't installed."""
+        if self._store is None:
+            try:
+                import tables
+            except ImportError:
+                return False
+            self._store = pd.HDFStore(self.output_path, mode='w', complib=H5_COMPLIB, complevel=H5_COMPLEVEL)
+        # The time index is built once, on close, rather than on every append
+        self._store.append(self.key, df, format='table', index=False,
+                           expectedrows=self.expectedrows or len(df))
+        return True
+
+    def _append_h5py(self, df):
+        """Append to the values/columns/index layout of the h5py fallback."""
+        # write_direct needs C order; mixed-dtype frames hand back Fortran order
+        values = np.ascontiguousarray(df.to_numpy())
+        if self._h5 is None:
+            import h5py
+            self._h5 = h5py.File(self.output_path, 'w')
+            group = self._h5.create_group(self.key)
+            group.create_dataset('values', shape=(0, values.shape[1]), maxshape=(None, values.shape[1]),
+                                 dtype=values.dtype, chunks=(H5_CHUNK_ROWS, values.shape[1]), compression='lzf')
+            group.create_dataset('columns', data=np.array([str(c).encode('utf-8') for c in df.columns]))
+            group.create_dataset('index', shape=(0,), maxshape=(None,), dtype=np.int64,
+                                 chunks=(H5_CHUNK_ROWS,), compression='lzf')
+        group = self._h5[self.key]
+        end = self.rows + len(df)
+        for name, chunk in (('values', values), ('index', df.index.as_unit('ns').asi8)):
+            group[name].resize(end, axis=0)
+            group[name].write_direct(chunk, dest_sel=np.s_[self.rows:end])
+
+    def close(self):
+        if self._store is not None and self._store.is_open and self.rows:
+            self._store.create_table_index(self.key, columns=['index'], optlevel=9, kind='full')
+        for handle in (self._csv, self._store, self._h5):
+            if handle is not None:
+                handle.close()
+        self._csv = self._store = self._h5 = None
+
+def _write_bars_streaming(slabs, writer):
+    """
+    Write the slabs' bars to writer as they are completed, in time order.
 
-        if start_date:
-            raw_start = to_raw(start_date)
-            df = df[df['Time'] >= raw_start]
-        if end_date:
-            raw_end = to_raw(end_date)
-            df = df[df['Time'] < raw_end]
+    Each slab's last minute is held back and merged into the next slab's
+    first, since a minute can straddle two slabs. Returns (rows in range,
+    valid ticks), or None if a slab starts before the held-back minute
+    (ticks out of order across slabs), in which case the file is incomplete.
+    """
+    rows_in_range = 0
+    n_ticks = 0
+    carry = None
+    for in_range, kept, minute_idx, bars in slabs:
+        rows_in_range += in_range
+        if not kept:
+            continue
+        n_ticks += kept
+        if carry is not None:
+            carry_minutes, carry_bars = carry
+            if minute_idx.min() < carry_minutes[0]:
+                return None
+            minute_idx = np.concatenate((carry_minutes, minute_idx))
+            bars = {name: np.concatenate((carry_bars[name], bars[name])) for name in bars}
+        minute_idx, bars = aggregate_minutes(minute_idx, bars)
+        writer.append(bars_frame(minute_idx[:-1], {name: v[:-1] for name, v in bars.items()}))
+        carry = (minute_idx[-1:], {name: v[-1:] for name, v in bars.items()})
+    if carry is not None:
+        writer.append(bars_frame(carry[0], carry[1]))
+    return rows_in_range, n_ticks
+
+def resample_scid_to_1min(file_path, output_path=None, start_date=None, end_date=None, limit=None, price_multiplier=1.0, use_config=True, return_df=True):
+    """
+    Highly efficient conversion of SCID tick data to 1-minute OHLCV data.
+    Uses memory mapping and vectorized operations to maximize performance.
 
-    if df.empty:
-        print("No data found matching criteria.")
+    With output_path and return_df=False the bars are written slab by slab
+    as they are completed and never held in memory together; None is
+    returned.
+    """
+    start_time = time.perf_counter()
+    selection = open_scid(file_path, start_date, end_date, limit, use_config)
+    if selection is None:
         return None
 
-    # Handle Bundle Trade Markers (SCID specific)
-    # The Open field can contain markers like -1.99e37. We must clean these
-    # before resampling to avoid corrupting OHLC values.
-    # Regular trades have abs(Open) < 1e10
-    mask = np.abs(df['Open']) < 1e10
-
-    # For OHLC, we only want rows with valid prices.
-    # For Volume/Trades, we keep everything usually, but the markers are typically
-    # attached to rows where Volume is valid anyway.
-    df_clean = df[mask].copy()
-
-    # Apply Price Multiplier (e.g., 0.01 to convert 653100 to 6531.00)
+    # A float32 constant keeps the scaled prices float32 (half the bytes of
+    # float64) whatever NumPy's promotion rules for Python floats
+    price_multiplier = np.float32(price_multiplier)
     if price_multiplier != 1.0:
         print(f"Applying price multiplier: {price_multiplier}")
-        for col in ['Open', 'High', 'Low', 'Close']:
-            df_clean[col] = df_clean[col] * price_multiplier
 
-    if df_clean.empty:
+    n_records = len(selection.records)
+    print(f"Aggregating {n_records:,} ticks in slabs of {CHUNK_RECORDS:,}...")
+
+    if output_path and not return_df:
+        expectedrows = None
+        if n_records:
+            # Minutes spanned by a time-ordered file; PyTables sizes its chunks by it
+            span = int(selection.records['Time'][-1]) - int(selection.records['Time'][0])
+            expectedrows = max(1, min(n_records, span // MINUTE_US + 1))
+        writer = _BarWriter(output_path, expectedrows)
+        try:
+            counts = _write_bars_streaming(_iter_slabs(selection, price_multiplier), writer)
+        except Exception as e:
+            selection.close()
+            print(f"Error writing {output_path}: {e}")
+            return None
+        finally:
+            writer.close()
+
+        if counts is not None:
+            selection.close()
+            rows_in_range, n_ticks = counts
+            if rows_in_range == 0:
+                print("No data found matching criteria.")
+            elif n_ticks == 0:
+                print("No valid price data found after filtering bundle markers.")
+            else:
+                end_time = time.perf_counter()
+                print(f"Conversion completed in {end_time - start_time:.4f} seconds.")
+                print(f"Ticks processed: {n_ticks:,}")
+                print(f"Minutes generated: {writer.rows:,}")
+                print(f"Saved to {output_path}")
+            return None
+
+        print("Ticks are out of order across slabs; merging all bars in memory instead.")
+
+    rows_in_range = 0
+    n_ticks = 0
+    partials = []
+    try:
+        for in_range, kept, minute_idx, bars in _iter_slabs(selection, price_multiplier):
+            rows_in_range += in_range
+            if kept:
+                n_ticks += kept
+                partials.append((minute_idx, bars))
+    finally:
+        # The partial bars are copies; the mapping is no longer needed
+        selection.close()
+
+    if rows_in_range == 0:
+        print("No data found matching criteria.")
+        return None
+    if n_ticks == 0:
         print("No valid price data found after filtering bundle markers.")
         return None
 
-    # IMPROVEMENT: Handle 0.0 Open prices
-    # Sierra Chart often uses 0.0 for regular trades, with the real price in High/Low/Close.
-    # We update Open to match Close for these ticks so the 1-minute Open is accurate.
-    df_clean.loc[df_clean['Open'] == 0.0, 'Open'] = df_clean['Close']
-
-    # VECTORIZED OPTIMIZATION:
-    # Instead of converting every tick to datetime (slow),
-    # we work with integer minutes.
-    # Minute index = Time // 60,000,000
-    df_clean['MinuteIndex'] = df_clean['Time'] // MINUTE_US
-
-    print(f"Aggregating {len(df_clean):,} valid ticks...")
-
-    # Group by MinuteIndex and aggregate
-    resampled = df_clean.groupby('MinuteIndex').agg({
-        'Open': 'first',
-        'High': 'max',
-        'Low': 'min',
-        'Close': 'last',
-        'Trades': 'sum',
-        'Volume': 'sum',
-        'BidVolume': 'sum',
-        'AskVolume': 'sum'
-    })
-
-    # Only now do we convert the resulting minute indices to actual datetimes
-    # This happens only once per minute (e.g., 1,440 times per day) instead of per tick
-    resampled.index = pd.to_datetime((resampled.index * MINUTE_US) - SC_EPOCH_US, unit='us', utc=True)
-    resampled.index.name = 'DateTime'
+    resampled = bars_frame(*merge_bars(partials))
 
     end_time = time.perf_counter()
     print(f"Conversion completed in {end_time - start_time:.4f} seconds.")
-    print(f"Ticks processed: {len(df_clean):,}")
+    print(f"Ticks processed: {n_ticks:,}")
     print(f"Minutes generated: {len(resampled):,}")
 
     if output_path:
-        out = Path(output_path)
-        if out.suffix.lower() in ['.h5', '.hdf5']:
-            save_to_hdf5(resampled, output_path)
-        else:
-            resampled.to_csv(output_path)
-            print(f"Saved to {output_path}")
+        save_bars(resampled, output_path)
 
-    return resampled
+    return resampled if return_df else None
+
+def save_bars(df, output_path):
+    """Write bars to output_path: HDF5 for .h5/.hdf5, CSV otherwise."""
+    if Path(output_path).suffix.lower() in ['.h5', '.hdf5']:
+        save_to_hdf5(df, output_path)
+    else:
+        df.to_csv(output_path)
+        print(f"Saved to {output_path}")
 
 def save_to_hdf5(df, output_path, key='data'):
     """
@@ -182,7 +317,13 @@ def save_to_hdf5(df, output_path, key='data'):
     try:
         # Preferred method (PyTables)
         import tables
-        df.to_hdf(output_path, key=key, mode='w', format='table', complib='blosc', complevel=9)
+        # Blosc/Zstd at level 3 beats gzip-9 on ratio at a fraction of the
+        # write time; expectedrows lets PyTables size the chunks for the file.
+        # The time index gets a fully sorted (CSI) index, so where= range
+        # queries on it stay index lookups even if rows are out of order.
+        with pd.HDFStore(output_path, mode='w', complib=H5_COMPLIB, complevel=H5_COMPLEVEL) as store:
+            store.append(key, df, format='table', index=False, expectedrows=len(df))
+            store.create_table_index(key, columns=['index'], optlevel=9, kind='full')
         print(f"Saved to HDF5 (via tables): {output_path} (key='{key}')")
     except ImportError:
         # Fallback method (h5py)
@@ -191,12 +332,20 @@ def save_to_hdf5(df, output_path, key='data'):
             with h5py.File(output_path, 'w') as hf:
                 # Save data values
                 group = hf.create_group(key)
-                group.create_dataset('values', data=df.values, compression='gzip', compression_opts=9)
-                # Save column names as UTF-8 strings
-                group.create_dataset('columns', data=df.columns.values.astype('S'), compression='gzip')
+                # LZF ships with h5py, so any h5py can read the file back; it is
+                # far faster to write than gzip-9
+                # Written straight from one C-ordered array (mixed-dtype frames
+                # hand back Fortran order)
+                values = np.ascontiguousarray(df.to_numpy())
+                dset = group.create_dataset('values', shape=values.shape, dtype=values.dtype, compression='lzf',
+                                            chunks=(max(1, min(len(values), H5_CHUNK_ROWS)), values.shape[1]))
+                dset.write_direct(values)
+                # Save column names as UTF-8 byte strings, encoded straight
+                # from the names (no object-array round trip)
+                group.create_dataset('columns', data=np.array([str(c).encode('utf-8') for c in df.columns]))
                 # Save index (timestamps) as nanoseconds since Unix Epoch
                 # This is a common way to store time in direct HDF5
-                group.create_dataset('index', data=df.index.view(np.int64), compression='gzip')
+                group.create_dataset('index', data=df.index.as_unit('ns').asi8, compression='lzf')
 
             print(f"Saved to HDF5 (via h5py fallback): {output_path} (key='{key}')")
             print("Note: This fallback format stores [values, columns, index] as separate internal datasets.")
@@ -218,7 +367,9 @@ if __name__ == "__main__":
         input_file = sys.argv[1]
         output_file = sys.argv[2] if len(sys.argv) > 2 else None
         multiplier = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
-        df = resample_scid_to_1min(input_file, output_path=output_file, price_multiplier=multiplier)
+        # With an output file the bars are streamed to it, not kept for display
+        df = resample_scid_to_1min(input_file, output_path=output_file, price_multiplier=multiplier,
+                                   return_df=output_file is None)
     else:
         print(f"Running with default test file: {test_file}")
         # Automatically save to HDF5 if user wants a quick test of the format
@@ -0,0 +1,160 @@
+"""
+Kernels over raw SCID record columns.
+
+``resample_1min`` turns tick columns into 1-minute OHLCV bars in a single
+pass. Without Numba it still runs, as a (slow) Python loop; callers should
+check ``NUMBA_AVAILABLE`` and use their NumPy path instead.
+``time_range_bounds`` locates a date range in a time-ordered Time column
+with binary search, and ``compress_ohlc`` pulls the four price fields out
+of the records as one block. ``fill_zero_open`` uses numexpr when it is
+installed (``NUMEXPR_AVAILABLE``).
+"""
+
+import os
+
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+from numba_compat import njit, NUMBA_AVAILABLE
+
+try:
+    import numexpr
+    # numexpr caps its default pool at 8 threads; use every core unless
+    # NUMEXPR_NUM_THREADS says otherwise
+    if 'NUMEXPR_NUM_THREADS' not in os.environ:
+        numexpr.set_num_threads(min(os.cpu_count() or 1, numexpr.MAX_THREADS))
+    NUMEXPR_AVAILABLE = True
+except ImportError:
+    numexpr = None
+    NUMEXPR_AVAILABLE = False
+
+# Regular trades have abs(Open) below this; bundle trade markers are ~-2e37
+BUNDLE_MARKER_ABS = 1e10
+
+# Adjacent float32 fields of a SCID record
+OHLC_FIELDS = ('Open', 'High', 'Low', 'Close')
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def resample_1min(time, open_, high, low, close, trades, volume, bid_volume, ask_volume,
+                  raw_start, raw_end, minute_us):
+    """
+    Filter, clean and aggregate ticks into per-minute bars in one pass.
+
+    Rows outside [raw_start, raw_end) and bundle markers are skipped, a
+    0.0 Open takes the row's Close, and each run of consecutive ticks in
+    the same minute becomes one bar (first Open, max High, min Low, last
+    Close, summed volumes). Out-of-order input yields one bar per run, to
+    be merged by the caller.
+
+    Returns (rows in range, ticks kept, minute indices, open, high, low,
+    close, trades, volume, bid_volume, ask_volume), the arrays sized to the
+    bar count.
+    """
+    n = len(time)
+    minutes = np.empty(n, dtype=np.uint64)
+    o_out = np.empty(n, dtype=open_.dtype)
+    h_out = np.empty(n, dtype=high.dtype)
+    l_out = np.empty(n, dtype=low.dtype)
+    c_out = np.empty(n, dtype=close.dtype)
+    tr_out = np.empty(n, dtype=trades.dtype)
+    v_out = np.empty(n, dtype=volume.dtype)
+    bv_out = np.empty(n, dtype=bid_volume.dtype)
+    av_out = np.empty(n, dtype=ask_volume.dtype)
+
+    in_range = 0
+    kept = 0
+    k = -1
+    for i in range(n):
+        t = time[i]
+        if t < raw_start or t >= raw_end:
+            continue
+        in_range += 1
+        o = open_[i]
+        if not abs(o) < BUNDLE_MARKER_ABS:
+            continue
+        kept += 1
+        c = close[i]
+        if o == 0.0:
+            o = c
+
+        minute = t // minute_us
+        if k < 0 or minute != minutes[k]:
+            k += 1
+            minutes[k] = minute
+            o_out[k] = o
+            h_out[k] = high[i]
+            l_out[k] = low[i]
+            tr_out[k] = trades[i]
+            v_out[k] = volume[i]
+            bv_out[k] = bid_volume[i]
+            av_out[k] = ask_volume[i]
+        else:
+            h_out[k] = max(h_out[k], high[i])
+            l_out[k] = min(l_out[k], low[i])
+            tr_out[k] += trades[i]
+            v_out[k] += volume[i]
+            bv_out[k] += bid_volume[i]
+            av_out[k] += ask_volume[i]
+        c_out[k] = c
+
+    # Copies, so the worst-case (one bar per tick) buffers are freed
+    k += 1
+    return (in_range, kept, minutes[:k].copy(), o_out[:k].copy(), h_out[:k].copy(),
+            l_out[:k].copy(), c_out[:k].copy(), tr_out[:k].copy(), v_out[:k].copy(),
+            bv_out[:k].copy(), av_out[:k].copy())
+
+
+def time_range_bounds(time, raw_start=None, raw_end=None):
+    """
+    (lo, hi) such that exactly time[lo:hi] lies in [raw_start, raw_end), or None.
+
+    SCID files are written in time order, so the range is normally one run
+    found by binary search; the run is confirmed with min/max reductions (no
+    mask, no copy). For out-of-order data None is returned, and the caller
+    filters row by row instead.
+    """
+    start = np.uint64(raw_start if raw_start is not None else 0)
+    end = np.uint64(raw_end if raw_end is not None else np.iinfo(np.uint64).max)
+    lo, hi = (int(i) for i in np.searchsorted(time, np.array([start, end], dtype=np.uint64)))
+    if lo > 0 and time[:lo].max() >= start:
+        return None
+    if hi < len(time) and time[hi:].min() < end:
+        return None
+    if hi > lo:
+        inside = time[lo:hi]
+        if inside.min() < start or inside.max() >= end:
+            return None
+    return lo, hi
+
+
+def compress_ohlc(records, mask, price_multiplier=1.0):
+    """
+    Open/High/Low/Close of the masked records as one (n, 4) float32 block.
+
+    The four fields sit next to each other in every record, so they are
+    viewed as an (N, 4) array over the records and compressed in a single
+    call; the multiplier is then applied to the whole block in place.
+    Columns are block[:, 0] (Open) to block[:, 3] (Close).
+    """
+    prices = structured_to_unstructured(records[list(OHLC_FIELDS)], copy=False)
+    block = np.compress(mask, prices, axis=0)
+    if price_multiplier != 1.0:
+        np.multiply(block, np.float32(price_multiplier), out=block)
+    return block
+
+
+def fill_zero_open(block):
+    """
+    Replace 0.0 Opens in an (n, 4) compress_ohlc() block with the Close, in place.
+
+    Sierra Chart often records regular trades with Open 0.0 and the real
+    price in High/Low/Close. With numexpr the compare and select run as one
+    threaded pass over the two columns instead of building a mask first.
+    """
+    open_, close = block[:, 0], block[:, 3]
+    if NUMEXPR_AVAILABLE:
+        numexpr.evaluate('where(o == 0, c, o)', local_dict={'o': open_, 'c': close}, out=open_)
+    else:
+        np.copyto(open_, close, where=open_ == 0.0)
+    return block
@@ -0,0 +1,321 @@
+"""
+Shared front half of the SCID export scripts.
+
+``open_scid`` maps a SCID file and narrows it to a date range, and
+``clean_stream`` walks the selected records in slabs, yielding cleaned column
+batches: rows outside the range and bundle trade markers dropped, a 0.0 Open
+filled from Close, prices scaled. resample_scid.py and scid_to_h5_ticks.py
+both start from them.
+
+Run directly, it writes 1-minute bars and raw ticks from a single pass over
+the file:
+
+    python scid_pipeline.py ESZ24_FUT_CME.scid --bars ESZ24_1min.h5 --ticks ESZ24_ticks.h5 --multiplier 0.01
+"""
+
+import argparse
+import json
+import mmap
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from scid_kernels import time_range_bounds, compress_ohlc, fill_zero_open, OHLC_FIELDS, BUNDLE_MARKER_ABS
+
+HEADER_SIZE = 56
+RECORD_SIZE = 40
+SC_EPOCH_US = 2209161600000000  # Microseconds from 1970-01-01 back to 1899-12-30
+
+# Records per slab (~160 MB of file); bounds memory on large files
+CHUNK_RECORDS = 4_000_000
+
+# Precise dtypes matching parser.py (<Q4f4I)
+SCID_DTYPE = np.dtype([
+    ("Time", "<u8"),      # Q
+    ("Open", "<f4"),      # f
+    ("High", "<f4"),      # f
+    ("Low", "<f4"),       # f
+    ("Close", "<f4"),     # f
+    ("Trades", "<u4"),    # I
+    ("Volume", "<u4"),    # I
+    ("BidVolume", "<u4"), # I
+    ("AskVolume", "<u4"), # I
+])
+
+# Contract dates from config.json by (config path, mtime, working directory)
+_CONFIG_DATES = {}
+
+
+def _load_config_dates(config_path):
+    """
+    {absolute contract file path (lowercase): (symbol, start_date, end_date)}.
+
+    Parsed once per unchanged config file (and working directory, which
+    relative paths resolve against), so exporting many contracts doesn't
+    re-read config.json for each one.
+    """
+    key = (str(Path(config_path).absolute()), os.stat(config_path).st_mtime_ns, os.getcwd())
+    dates = _CONFIG_DATES.get(key)
+    if dates is None:
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        dates = {}
+        for symbol, data in config.get("symbols", {}).items():
+            for contract in data.get("contracts", []):
+                contract_file = str(Path(contract.get("file", "")).absolute()).lower()
+                # The first matching contract wins, as in a linear scan
+                dates.setdefault(contract_file, (symbol, contract.get("start_date"), contract.get("end_date")))
+        _CONFIG_DATES[key] = dates
+    return dates
+
+
+def get_dates_from_config(file_path, config_path="config.json"):
+    """
+    Search config.json for a contract matching the given file path.
+    Returns (start_date, end_date) if found.
+    """
+    if not os.path.exists(config_path):
+        return None, None
+
+    try:
+        found = _load_config_dates(config_path).get(str(Path(file_path).absolute()).lower())
+        if found:
+            symbol, start_date, end_date = found
+            print(f"Found config for {symbol} contract: {start_date} to {end_date}")
+            return start_date, end_date
+    except Exception as e:
+        print(f"Warning: Could not read config.json: {e}")
+
+    return None, None
+
+
+def to_raw_time(date) -> int:
+    """Sierra Chart raw time (µs since 1899-12-30) of a date string or object, as UTC."""
+    ts = int(pd.to_datetime(date, utc=True).timestamp() * 1_000_000)
+    return ts + SC_EPOCH_US
+
+
+@dataclass
+class ScidSelection:
+    """
+    Records of a mapped SCID file, narrowed to a date range.
+
+    When the range is one contiguous run (time-ordered file) records is
+    sliced to it exactly and raw_start/raw_end are None; otherwise they are
+    the bounds still to be applied row by row.
+    """
+    records: np.ndarray
+    raw_start: Optional[int] = None
+    raw_end: Optional[int] = None
+    _mm: Optional[mmap.mmap] = field(default=None, repr=False)
+
+    def slabs(self, chunk: int = CHUNK_RECORDS) -> Iterator[np.ndarray]:
+        """Consecutive slices of at most chunk records."""
+        for lo in range(0, len(self.records), chunk):
+            yield self.records[lo:lo + chunk]
+
+    def close(self) -> None:
+        """
+        Unmap the file once the cleaned columns (copies) have been taken.
+
+        Frees the mapped pages now rather than at garbage collection, and
+        unpins the file on Windows. records is left empty. If views of the
+        old records are still alive the mapping can't be closed yet, and is
+        left to be released with them.
+        """
+        self.records = np.empty(0, dtype=SCID_DTYPE)
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+            self._mm = None
+
+
+def open_scid(file_path, start_date=None, end_date=None, limit=None, use_config=True) -> Optional[ScidSelection]:
+    """
+    Map a SCID file and select the records in [start_date, end_date).
+
+    Without dates, use_config looks the file up in config.json. Returns None
+    (after printing why) if the file is missing or too small.
+    """
+    f = Path(file_path)
+    if not f.exists():
+        print(f"Error: {f} not found")
+        return None
+
+    file_size = f.stat().st_size
+    if file_size < HEADER_SIZE:
+        print(f"Error: {f} is too small to be a valid SCID file")
+        return None
+
+    print(f"Loading {f.name} ({file_size / 1024 / 1024:.2f} MB)...")
+
+    # Try to get dates from config if not provided
+    if use_config and not start_date and not end_date:
+        start_date, end_date = get_dates_from_config(file_path)
+
+    # Map the file read-only; sequential advice lets the kernel read ahead
+    # and drop pages behind as the slabs are walked. When every record will
+    # be read anyway, MAP_POPULATE (Linux) faults the whole file in up front
+    # instead of page by page; a date range only touches part of the file.
+    populate = 0 if start_date or end_date or limit else getattr(mmap, 'MAP_POPULATE', 0)
+    with open(f, 'rb') as fh:
+        if hasattr(os, 'posix_fadvise'):
+            os.posix_fadvise(fh.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        if populate:
+            mm = mmap.mmap(fh.fileno(), 0, flags=mmap.MAP_SHARED | populate, prot=mmap.PROT_READ)
+        else:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, 'madvise'):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    records = np.frombuffer(mm, dtype=SCID_DTYPE, offset=HEADER_SIZE,
+                            count=(file_size - HEADER_SIZE) // RECORD_SIZE)
+
+    if limit:
+        print(f"Limiting to first {limit:,} records...")
+        records = records[:limit]
+
+    raw_start = to_raw_time(start_date) if start_date else None
+    raw_end = to_raw_time(end_date) if end_date else None
+
+    # Ticks are time-ordered, so the date range is normally one contiguous
+    # run: slice it out by binary search, and only the pages inside it are
+    # read. Out-of-order files keep the row-by-row range filter.
+    if raw_start is not None or raw_end is not None:
+        bounds = time_range_bounds(records['Time'], raw_start, raw_end)
+        if bounds is not None:
+            records = records[bounds[0]:bounds[1]]
+            raw_start = raw_end = None
+
+    return ScidSelection(records, raw_start, raw_end, mm)
+
+
+def clean_batch(slab, raw_start=None, raw_end=None, price_multiplier=1.0):
+    """
+    Cleaned columns of one slab of records.
+
+    Returns (rows in the date range, {column: array}) where the columns hold
+    only the regular trades in the range, or None in place of the dict when
+    there are none. Open..Close are views into one (n, 4) float32 block.
+    """
+    # Handle Bundle Trade Markers (SCID specific)
+    # The Open field can contain markers like -1.99e37. Regular trades have
+    # abs(Open) < 1e10. One row mask covers them and the date range, and
+    # each column is then compressed once, straight out of the mapping.
+    mask = np.abs(slab['Open']) < BUNDLE_MARKER_ABS
+
+    if raw_start is not None or raw_end is not None:
+        time_arr = slab['Time']
+        in_range = np.ones(len(slab), dtype=bool)
+        if raw_start is not None:
+            in_range &= time_arr >= raw_start
+        if raw_end is not None:
+            in_range &= time_arr < raw_end
+        rows_in_range = np.count_nonzero(in_range)
+        mask &= in_range
+    else:
+        rows_in_range = len(slab)
+
+    # Apply Price Multiplier (e.g., 0.01 to convert 653100 to 6531.00) to
+    # the (n, 4) price block in one pass
+    ohlc = compress_ohlc(slab, mask, price_multiplier)
+    if len(ohlc) == 0:
+        return rows_in_range, None
+
+    # Sierra Chart often uses 0.0 for regular trades, with the real price in
+    # High/Low/Close; Open takes the Close so bar Opens are accurate
+    fill_zero_open(ohlc)
+
+    batch = {'Time': np.compress(mask, slab['Time'])}
+    for i, name in enumerate(OHLC_FIELDS):
+        batch[name] = ohlc[:, i]
+    for name in ('Trades', 'Volume', 'BidVolume', 'AskVolume'):
+        batch[name] = np.compress(mask, slab[name])
+    return rows_in_range, batch
+
+
+def clean_stream(selection: ScidSelection, price_multiplier=1.0,
+                 chunk: int = CHUNK_RECORDS) -> Iterator[Tuple[int, Optional[Dict[str, np.ndarray]]]]:
+    """Yield clean_batch() results for each slab of the selection, in file order."""
+    # A float32 constant keeps the scaled prices float32
+    price_multiplier = np.float32(price_multiplier)
+    for slab in selection.slabs(chunk):
+        yield clean_batch(slab, selection.raw_start, selection.raw_end, price_multiplier)
+
+
+def export_scid(file_path, bars_path=None, ticks_path=None, start_date=None, end_date=None,
+                limit=None, price_multiplier=1.0, use_config=True):
+    """
+    Write 1-minute bars and/or raw ticks from one pass over a SCID file.
+
+    Every cleaned batch feeds both outputs: it is reduced to partial bars
+    and kept for the tick frame, so the file is read and cleaned once.
+    Output formats follow the suffixes, as in the two scripts. Returns
+    (bars, ticks) frames (None for an output not asked for), or None.
+    """
+    from resample_scid import MINUTE_US, BAR_COLUMNS, aggregate_minutes, merge_bars, bars_frame, save_bars
+    from scid_to_h5_ticks import ticks_frame, save_ticks
+
+    start_time = time.perf_counter()
+    selection = open_scid(file_path, start_date, end_date, limit, use_config)
+    if selection is None:
+        return None
+
+    if price_multiplier != 1.0:
+        print(f"Applying price multiplier: {np.float32(price_multiplier)}")
+
+    rows_in_range = 0
+    partials = []
+    batches = []
+    try:
+        for in_range, batch in clean_stream(selection, price_multiplier):
+            rows_in_range += in_range
+            if batch is None:
+                continue
+            if ticks_path:
+                batches.append(batch)
+            if bars_path:
+                partials.append(aggregate_minutes(batch['Time'] // MINUTE_US,
+                                                  {name: batch[name] for name in BAR_COLUMNS}))
+    finally:
+        selection.close()
+
+    if rows_in_range == 0:
+        print("No data found matching criteria.")
+        return None
+    if not batches and not partials:
+        print("No valid price data found after filtering bundle markers.")
+        return None
+
+    bars = ticks = None
+    if bars_path:
+        bars = bars_frame(*merge_bars(partials))
+        print(f"Minutes generated: {len(bars):,}")
+        save_bars(bars, bars_path)
+    if ticks_path:
+        ticks = ticks_frame(batches)
+        save_ticks(ticks, ticks_path)
+
+    print(f"Export completed in {time.perf_counter() - start_time:.4f} seconds.")
+    return bars, ticks
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Export 1-minute bars and raw ticks from one pass over a SCID file")
+    cli.add_argument("input", help="SCID file")
+    cli.add_argument("--bars", metavar="PATH", help="1-minute bars output (.csv or .h5)")
+    cli.add_argument("--ticks", metavar="PATH", help="Raw ticks output (.h5 or .parquet)")
+    cli.add_argument("--multiplier", type=float, default=1.0, help="Price multiplier (e.g. 0.01)")
+    cli.add_argument("--start-date", help="First day to export (YYYY-MM-DD)")
+    cli.add_argument("--end-date", help="Day to stop before (YYYY-MM-DD)")
+    args = cli.parse_args()
+    if not args.bars and not args.ticks:
+        cli.error("give --bars and/or --ticks")
+    export_scid(args.input, args.bars, args.ticks, args.start_date, args.end_date,
+                price_multiplier=args.multiplier)
@@ -1,159 +1,174 @@
 import sys
-import os
-import json
 from pathlib import Path
 import numpy as np
 import pandas as pd
 import time
 
-def get_dates_from_config(file_path, config_path="config.json"):
-    """
-    Search config.json for a contract matching the given file path.
-    Returns (start_date, end_date) if found.
-    """
-    if not os.path.exists(config_path):
-        return None, None
-
-    try:
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-
-        target_path = str(Path(file_path).absolute()).lower()
+from scid_pipeline import (open_scid, clean_stream, get_dates_from_config,  # noqa: F401 - re-exported
+                           SC_EPOCH_US)
 
-        for symbol, data in config.get("symbols", {}).items():
-            for contract in data.get("contracts", []):
-                contract_file = str(Path(contract.get("file", "")).absolute()).lower()
-                if contract_file == target_path:
-                    print(f"Found config for {symbol} contract: {contract.get('start_date')} to {contract.get('end_date')}")
-                    return contract.get("start_date"), contract.get("end_date")
-    except Exception as e:
-        print(f"Warning: Could not read config.json: {e}")
+# HDF5 compression: Blosc/Zstd with PyTables, LZF (built into h5py) otherwise
+H5_COMPLIB = 'blosc:zstd'
+H5_COMPLEVEL = 3
 
-    return None, None
-
-def export_scid_ticks_to_h5(file_path, output_path, start_date=None, end_date=None, limit=None, price_multiplier=1.0, use_config=True):
+def export_scid_ticks_to_h5(file_path, output_path, start_date=None, end_date=None, limit=None, price_multiplier=1.0, use_config=True, queryable=False):
     """
     Export raw tick data from SCID to HDF5.
     Uses memory mapping and vectorized operations.
+    queryable=True writes a PyTables 'table' instead of 'fixed' (see save_to_hdf5).
     """
-    f = Path(file_path)
-    if not f.exists():
-        print(f"Error: {f} not found")
-        return None
-
-    # Constants
-    HEADER_SIZE = 56
-    RECORD_SIZE = 40
-    SC_EPOCH_US = 2209161600000000 # Microseconds from 1970-01-01 back to 1899-12-30
-
-    # Precise dtypes matching parser.py (<Q4f4I)
-    sciddtype = np.dtype([
-        ("Time", "<u8"),      # Q
-        ("Open", "<f4"),      # f
-        ("High", "<f4"),      # f
-        ("Low", "<f4"),       # f
-        ("Close", "<f4"),     # f
-        ("Trades", "<u4"),    # I
-        ("Volume", "<u4"),    # I
-        ("BidVolume", "<u4"), # I
-        ("AskVolume", "<u4"), # I
-    ])
-
-    stat = f.stat()
-    file_size = stat.st_size
-
-    if file_size < HEADER_SIZE:
-        print(f"Error: {f} is too small to be a valid SCID file")
-        return None
-
-    print(f"Loading {f.name} ({file_size / 1024 / 1024:.2f} MB)...")
     start_time = time.perf_counter()
-
-    # Use memmap for instant access
-    data = np.memmap(f, dtype=sciddtype, offset=HEADER_SIZE, mode="r")
-
-    if limit:
-        print(f"Limiting to first {limit:,} records...")
-        data = data[:limit]
-
-    # Create DataFrame from memmap
-    df = pd.DataFrame(data, copy=False)
-
-    # Try to get dates from config if not provided
-    if use_config and not start_date and not end_date:
-        start_date, end_date = get_dates_from_config(file_path)
-
-    # Fast filtering by raw timestamp
-    if start_date or end_date:
-        def to_raw(dt_str):
-            ts = int(pd.to_datetime(dt_str, utc=True).timestamp() * 1_000_000)
-            return ts + SC_EPOCH_US
-
-        if start_date:
-            raw_start = to_raw(start_date)
-            df = df[df['Time'] >= raw_start]
-        if end_date:
-            raw_end = to_raw(end_date)
-            df = df[df['Time'] < raw_end]
-
-    if df.empty:
-        print("No data found matching criteria.")
+    selection = open_scid(file_path, start_date, end_date, limit, use_config)
+    if selection is None:
         return None
 
-    # Handle Bundle Trade Markers (SCID specific)
-    # Filter out rows that are just markers if needed, or just clean the prices.
-    # Regular trades have abs(Open) < 1e10
-    mask = np.abs(df['Open']) < 1e10
-    df_clean = df[mask].copy()
-
-    # Apply Price Multiplier
     if price_multiplier != 1.0:
         print(f"Applying price multiplier: {price_multiplier}")
-        for col in ['Open', 'High', 'Low', 'Close']:
-            df_clean[col] = df_clean[col] * price_multiplier
-
-    # Sierra Chart often uses 0.0 for regular trades in Open, copy from Close
-    df_clean.loc[df_clean['Open'] == 0.0, 'Open'] = df_clean['Close']
 
-    # Convert Time to actual Datetime index
-    print(f"Converting timestamps for {len(df_clean):,} tokens...")
-    df_clean['DateTime'] = pd.to_datetime(df_clean['Time'] - SC_EPOCH_US, unit='us', utc=True)
-    df_clean.set_index('DateTime', inplace=True)
+    # The whole selection as one batch: its columns become the frame's
+    # columns as they are, with no concatenation
+    rows_in_range = 0
+    batches = []
+    try:
+        for in_range, batch in clean_stream(selection, price_multiplier, chunk=max(1, len(selection.records))):
+            rows_in_range += in_range
+            if batch is not None:
+                batches.append(batch)
+    finally:
+        # The batches are copies; the mapping is no longer needed
+        selection.close()
+
+    if rows_in_range == 0:
+        print("No data found matching criteria.")
+        return None
+    if not batches:
+        print("No valid price data found after filtering bundle markers.")
+        return None
 
-    # Drop the raw Time column
-    df_clean.drop(columns=['Time'], inplace=True)
+    df_clean = ticks_frame(batches)
 
     end_time = time.perf_counter()
     print(f"Processing completed in {end_time - start_time:.4f} seconds.")
 
     if output_path:
-        save_to_hdf5(df_clean, output_path)
+        save_ticks(df_clean, output_path, queryable=queryable)
 
     return df_clean
 
-def save_to_hdf5(df, output_path, key='ticks'):
+def ticks_frame(batches):
+    """
+    DataFrame of cleaned tick batches (scid_pipeline.clean_stream), indexed by UTC time.
+
+    A single batch's columns back the frame without being copied.
+    """
+    if len(batches) == 1:
+        cols = dict(batches[0])
+    else:
+        cols = {name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]}
+
+    # Convert Time to actual Datetime index
+    t = cols.pop('Time')
+    print(f"Converting timestamps for {len(t):,} tokens...")
+    # Shift a single int64 copy of Time to the Unix epoch in place and view
+    # it as datetime64[us]; no second array and no to_datetime() parsing
+    t = t.astype(np.int64)
+    t -= SC_EPOCH_US
+    index = pd.DatetimeIndex(t.view('datetime64[us]'), name='DateTime').tz_localize('UTC')
+
+    # The raw Time column is left out of the frame
+    return pd.DataFrame(cols, index=index, copy=False)
+
+def save_ticks(df, output_path, queryable=False):
+    """Write ticks to output_path: Parquet for .parquet, HDF5 otherwise."""
+    if Path(output_path).suffix.lower() == '.parquet':
+        save_to_parquet(df, output_path)
+    else:
+        save_to_hdf5(df, output_path, queryable=queryable)
+
+def save_to_hdf5(df, output_path, key='ticks', queryable=False):
     """
     Save the DataFrame to an HDF5 file.
+
+    With PyTables the ticks are written in pandas 'fixed' format: the columns
+    are stored as plain compressed arrays, smaller and faster to write than a
+    'table', but always read back whole. queryable=True writes a 'table'
+    instead, for readers that need where= queries or chunked reads.
     """
     try:
         import tables
-        df.to_hdf(output_path, key=key, mode='w', format='table', complib='blosc', complevel=9)
+        if queryable:
+            # expectedrows lets PyTables size the chunks for the whole file; a
+            # fully sorted (CSI) index on the time index keeps where= range
+            # queries index lookups even for out-of-order ticks
+            with pd.HDFStore(output_path, mode='w', complib=H5_COMPLIB, complevel=H5_COMPLEVEL) as store:
+                store.append(key, df, format='table', index=False, expectedrows=len(df))
+                store.create_table_index(key, columns=['index'], optlevel=9, kind='full')
+        else:
+            df.to_hdf(output_path, key=key, mode='w', format='fixed',
+                      complib=H5_COMPLIB, complevel=H5_COMPLEVEL)
         print(f"Saved to HDF5 (via tables): {output_path} (key='{key}')")
     except ImportError:
         try:
             import h5py
             with h5py.File(output_path, 'w') as hf:
                 group = hf.create_group(key)
-                group.create_dataset('values', data=df.values, compression='gzip', compression_opts=9)
-                group.create_dataset('columns', data=df.columns.values.astype('S'), compression='gzip')
-                group.create_dataset('index', data=df.index.view(np.int64), compression='gzip')
+                # write_direct needs C order; mixed-dtype frames hand back Fortran order
+                values = np.ascontiguousarray(df.to_numpy())
+                # Chunk as ~1 MB single-column stripes so readers that only need
+                # one column (e.g. the backtest's Close) skip the others entirely.
+                stripe_rows = max(1, min(len(values), (1 << 20) // values.dtype.itemsize))
+                dset = group.create_dataset('values', shape=values.shape, dtype=values.dtype,
+                                            chunks=(stripe_rows, 1), compression='lzf')
+                dset.write_direct(values)
+                # Fixed-width byte strings, encoded straight from the names
+                group.create_dataset('columns', data=np.array([str(c).encode('utf-8') for c in df.columns]))
+                group.create_dataset('index', data=df.index.as_unit('ns').asi8, compression='lzf')
             print(f"Saved to HDF5 (via h5py fallback): {output_path} (key='{key}')")
         except ImportError:
             print("Error: Could not save to HDF5. Please install 'tables' or 'h5py'.")
 
+def save_to_parquet(df, output_path, partition_by_date=True):
+    """
+    Save the DataFrame as Parquet (Zstd level 3, dictionary encoding).
+
+    With partition_by_date the output is a directory with one
+    date=YYYY-MM-DD subdirectory per UTC day, so a backtest can load a
+    single day without decoding the whole contract, e.g.
+    pd.read_parquet(path, filters=[('date', '=', '2024-03-05')]). Read
+    without filters, the directory comes back as one frame (plus a 'date'
+    column). Days being
+    written replace what is already there. Otherwise a single file is
+    written.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Error: Could not save to Parquet. Please install 'pyarrow'.")
+        return
+
+    table = pa.Table.from_pandas(df)
+    if not partition_by_date:
+        pq.write_table(table, output_path, compression='zstd', compression_level=3, use_dictionary=True)
+        print(f"Saved to Parquet: {output_path}")
+        return
+
+    # The index is UTC, so its datetime64 values truncate straight to days
+    days = df.index.values.astype('datetime64[D]')
+    table = table.append_column('date', pa.array(days, type=pa.date32()))
+    ds.write_dataset(
+        table, output_path, format='parquet',
+        partitioning=ds.partitioning(pa.schema([('date', pa.date32())]), flavor='hive'),
+        existing_data_behavior='delete_matching',
+        file_options=ds.ParquetFileFormat().make_write_options(
+            compression='zstd', compression_level=3, use_dictionary=True),
+    )
+    print(f"Saved to Parquet: {output_path} ({len(np.unique(days))} daily partitions)")
+
 if __name__ == "__main__":
     if len(sys.argv) < 3:
-        print("Usage: python scid_to_h5_ticks.py <input_scid_file> <output_h5_file> [multiplier]")
+        print("Usage: python scid_to_h5_ticks.py <input_scid_file> <output_h5_file|output_dir.parquet> [multiplier]")
     else:
         input_file = sys.argv[1]
         output_file = sys.argv[2]
@@ -0,0 +1,136 @@
+"""
+Optional io_uring file reads (Linux only).
+
+Exposes ``IoUringReader``, which reads a byte range of a file in fixed-size
+chunks with several reads queued ahead of the consumer, so the drive keeps
+working while the previous chunk is parsed. Needs the ``liburing`` package
+and a kernel with io_uring (5.6+); ``URING_AVAILABLE`` is False when the
+package is missing, and constructing a reader raises OSError when the kernel
+refuses the ring (old kernel, seccomp), so callers can fall back to mmap.
+"""
+
+import os
+import sys
+
+try:
+    if sys.platform != 'linux':
+        raise ImportError("io_uring is Linux-only")
+    import liburing
+    URING_AVAILABLE = True
+except ImportError:
+    liburing = None
+    URING_AVAILABLE = False
+
+# Submission queue entries per ring
+QUEUE_DEPTH = 32
+
+# Reads kept in flight ahead of the chunk being consumed
+READ_AHEAD = 4
+
+
+class IoUringReader:
+    """
+    Iterate over file[start:end] as chunk_bytes-sized bytearrays, in order.
+
+    Every chunk is a fresh buffer owned by the caller, so arrays viewing it
+    stay valid after the iteration moves on.
+    """
+
+    def __init__(self, file_path: str, start: int, end: int, chunk_bytes: int,
+                 read_ahead: int = READ_AHEAD):
+        if not URING_AVAILABLE:
+            raise OSError("liburing is not installed")
+        self.start = start
+        self.end = end
+        self.chunk_bytes = chunk_bytes
+        self.read_ahead = max(1, min(read_ahead, QUEUE_DEPTH))
+
+        self._fd = os.open(file_path, os.O_RDONLY)
+        self._ring = liburing.Ring()
+        self._cqe = liburing.Cqe()
+        try:
+            liburing.io_uring_queue_init(QUEUE_DEPTH, self._ring)
+        except OSError:
+            os.close(self._fd)
+            raise
+        self._closed = False
+        try:
+            # Registered files skip the per-read fd refcount in the kernel
+            self._files = liburing.FileIndex([self._fd])
+            liburing.io_uring_register_files(self._ring, self._files)
+        except OSError:
+            self.close()
+            raise
+
+    def __enter__(self) -> "IoUringReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __iter__(self):
+        pending = {}     # chunk number -> (offset, buffer), submitted
+        done = {}        # chunk number -> bytes read, completed out of order
+        in_flight = 0
+        next_submit = 0
+        next_yield = 0
+        n_chunks = -(-(self.end - self.start) // self.chunk_bytes)
+
+        try:
+            while next_yield < n_chunks:
+                while next_submit < n_chunks and len(pending) < self.read_ahead:
+                    offset = self.start + next_submit * self.chunk_bytes
+                    buf = bytearray(min(self.chunk_bytes, self.end - offset))
+                    sqe = liburing.io_uring_get_sqe(self._ring)
+                    # fd 0 is the index of the registered file
+                    liburing.io_uring_prep_read(sqe, 0, buf, offset)
+                    liburing.io_uring_sqe_set_flags(sqe, liburing.IOSQE_FIXED_FILE)
+                    liburing.io_uring_sqe_set_data64(sqe, next_submit)
+                    pending[next_submit] = (offset, buf)
+                    next_submit += 1
+                    in_flight += 1
+                liburing.io_uring_submit(self._ring)
+
+                while next_yield not in done:
+                    chunk, res = self._wait()
+                    in_flight -= 1
+                    liburing.trap_error(res)
+                    done[chunk] = res
+
+                offset, buf = pending.pop(next_yield)
+                filled = done.pop(next_yield)
+                if filled < len(buf):
+                    self._finish_short_read(buf, offset, filled)
+                yield buf
+                next_yield += 1
+        finally:
+            # The kernel writes into pending buffers until their reads
+            # complete, so reap them before the buffers can be freed
+            while in_flight:
+                self._wait()
+                in_flight -= 1
+
+    def _wait(self):
+        """Reap one completion; returns (chunk number, result)."""
+        liburing.io_uring_wait_cqe(self._ring, self._cqe)
+        cqe = self._cqe[0]
+        chunk, res = liburing.io_uring_cqe_get_data64(cqe), cqe.res
+        liburing.io_uring_cqe_seen(self._ring, cqe)
+        return chunk, res
+
+    def _finish_short_read(self, buf: bytearray, offset: int, filled: int) -> None:
+        """Complete a partial read synchronously (rare for regular files)."""
+        view = memoryview(buf)
+        while filled < len(buf):
+            n = os.preadv(self._fd, [view[filled:]], offset + filled)
+            if n == 0:
+                raise EOFError(f"File shrank while reading at offset {offset + filled}")
+            filled += n
+
+    def close(self) -> None:
+        """Tear down the ring and close the file."""
+        if self._closed:
+            return
+        self._closed = True
+        liburing.io_uring_queue_exit(self._ring)
+        os.close(self._fd)